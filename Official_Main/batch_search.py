@@ -0,0 +1,127 @@
+import json
+import sys
+import time
+from normalize import normalize
+from search_index import get_index, song_keys, title_artist_key
+from bloom import ScalableBloomFilter
+from external_sort import read_records
+
+MATCHED = "matched"
+AMBIGUOUS = "ambiguous"
+MISSING = "missing"
+
+# Resolve many (title, artist) queries at once. An empty artist matches on
+# title alone. Each result is (query, status, songs), in input order.
+# With --catalog, songs from INCOMING.json are instead checked against a
+# JSON-lines archive catalog that is streamed, never loaded.
+
+def batch_match(library, queries, use_index=True):
+    # the index is normally built at load already, so it is not timed here
+    index = get_index(library) if use_index else None
+    start = time.perf_counter()
+    queries = list(queries)
+    wanted = [(normalize(q[0]), normalize(q[1] if len(q) > 1 else "")) for q in queries]
+
+    if index is not None:
+        found = _index_lookup(index, wanted)
+    else:
+        found = _sort_merge(library, wanted)
+
+    results = []
+    counts = {MATCHED: 0, AMBIGUOUS: 0, MISSING: 0}
+    for query, songs in zip(queries, found):
+        status = MISSING if not songs else MATCHED if len(songs) == 1 else AMBIGUOUS
+        counts[status] += 1
+        results.append((query, status, songs))
+
+    seconds = time.perf_counter() - start
+    report = dict(counts, queries=len(queries), seconds=seconds,
+                  per_second=len(queries) / seconds if seconds else 0.0)
+    return results, report
+
+def _index_lookup(index, wanted):
+    found = []
+    for title, artist in wanted:
+        ids = index.title_artist_ids(title, artist) if artist else index.title_ids(title)
+        found.append([index.tracks[tid] for tid in ids])
+    return found
+
+def _sort_merge(library, wanted):
+    # one sort of each side, then a single merge pass; no index needed
+    rows = sorted(((k["title"], k["artist"]), i) for i, k in enumerate(map(song_keys, library)))
+    order = sorted(range(len(wanted)), key=lambda q: wanted[q])
+    found = [[] for _ in wanted]
+
+    r = 0
+    for q in order:
+        title, artist = wanted[q]
+        probe = (title, artist)
+        while r < len(rows) and rows[r][0] < probe:
+            r += 1
+        j = r
+        while j < len(rows) and rows[j][0][0] == title and (not artist or rows[j][0][1] == artist):
+            found[q].append(library[rows[j][1]])
+            j += 1
+    return found
+
+def new_for_catalog(catalog_path, songs, error_rate=0.01):
+    # For archival catalogs too large to load or index (JSON lines): one
+    # streamed pass fills a Bloom filter with the catalog's (title, artist)
+    # keys, songs the filter has never seen are new outright, and only the
+    # few it may have seen are checked exactly in a second streamed pass.
+    # Memory is the filter plus those candidate keys, never the catalog.
+    seen = ScalableBloomFilter(error_rate=error_rate)
+    for record in read_records(catalog_path):
+        seen.add(title_artist_key(record.get("title", ""), record.get("artist", "")))
+
+    keys = [title_artist_key(s.get("title", ""), s.get("artist", "")) for s in songs]
+    maybe = {k for k in keys if k in seen}
+    if maybe:
+        present = set()
+        for record in read_records(catalog_path):
+            k = title_artist_key(record.get("title", ""), record.get("artist", ""))
+            if k in maybe:
+                present.add(k)
+        maybe = present
+    return [s for s, k in zip(songs, keys) if k not in maybe]
+
+
+def print_report(report):
+    print(f"{report['queries']} queries in {report['seconds']:.3f}s "
+          f"({report['per_second']:.0f}/s): {report[MATCHED]} matched, "
+          f"{report[AMBIGUOUS]} ambiguous, {report[MISSING]} missing")
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_catalog(catalog_path, incoming_path, out_path=None):
+    songs = [s for s in load_json(incoming_path) if isinstance(s, dict)]
+    start = time.perf_counter()
+    new = new_for_catalog(catalog_path, songs)
+    print(f"{len(new)} of {len(songs)} songs are not in the catalog "
+          f"({time.perf_counter() - start:.1f}s)")
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(new, f, ensure_ascii=False, indent=2)
+
+
+USAGE = ("usage: python batch_search.py LIBRARY.json QUERIES.json\n"
+         "       python batch_search.py --catalog CATALOG.jsonl INCOMING.json [NEW.json]")
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["--catalog"]:
+        if len(sys.argv) not in (4, 5):
+            print(USAGE)
+            sys.exit(1)
+        check_catalog(*sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) != 3:
+        print(USAGE)
+        sys.exit(1)
+    library = load_json(sys.argv[1])
+    queries = [(q.get("title", ""), q.get("artist", "")) for q in load_json(sys.argv[2])]
+    _, report = batch_match(library, queries)
+    print_report(report)
@@ -0,0 +1,197 @@
+import argparse
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+
+from normalize import normalize
+from search_index import LibraryIndex
+from search import find_matches, normalize_query, stream_matches
+from sorting import TimSort, radix_sort
+from parallel_sort import ParallelSorter
+
+# Search latency benchmark over synthetic libraries.
+#
+#   python benchmark.py                          1k, 100k, 1M and 5M tracks
+#   python benchmark.py --sizes 1000,100000 --out bench.jsonl
+#   python benchmark.py --sort-bench            sort paths on 1M and 10M rows
+#
+# Each result line is JSON with the commit, library size, path and p50/p95/p99
+# in milliseconds, so runs from different commits can be diffed directly.
+# The 1M and 5M libraries need several GB of RAM for the full index.
+
+SIZES = (1000, 100000, 1000000, 5000000)
+SORT_SIZES = (1000000, 10000000)
+TIMSORT_LIMIT = 1000000     # the pure-Python TimSort takes minutes past this
+
+GENRES = ["Pop", "Rock", "Alt Indie", "Hip-Hop", "Electropop", "J-Pop", "K-Pop", "Soft Rock",
+          "Jazz", "Classical", "EDM", "Dance Pop", "Metal", "Folk", "R&B", "Soul", "Country",
+          "Reggaetón", "Bossa Nova", "Shoegaze", "Trip Hop", "Lo-fi", "Ambient", "Punk"]
+SYLLABLES = ["ra", "di", "o", "head", "mit", "ski", "ash", "nik", "ko", "bey", "on", "cé",
+             "sig", "ur", "rós", "lo", "ve", "na", "to", "ky", "东", "京", "ελ", "λά", "da",
+             "ke", "mi", "zu", "ño", "fa", "tal", "moon", "sun", "star", "lit", "el"]
+WORDS = ["love", "down", "let", "night", "heart", "fire", "rain", "dream", "girl", "boy",
+         "forever", "angel", "city", "lights", "summer", "blue", "wild", "home", "run", "away",
+         "police", "karma", "música", "corazón", "nuit", "été", "schön", "夜", "愛", "ночь",
+         "ocean", "eyes", "remaster", "live", "acoustic", "version", "mix", "tonight", "gold"]
+
+
+def zipf_weights(n, s=1.1):
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+def make_name(rng, parts=(2, 4)):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(*parts))).title()
+
+def generate_library(n, seed=0):
+    rng = random.Random(seed)
+    artists = [make_name(rng) + (" " + make_name(rng, (1, 2)) if rng.random() < 0.4 else "")
+               for _ in range(max(10, n // 12))]
+    albums = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+              for _ in range(max(10, n // 8))]
+    word_weights = zipf_weights(len(WORDS))
+    artist_weights = zipf_weights(len(artists))
+    genre_weights = zipf_weights(len(GENRES), 1.3)
+
+    library = []
+    for artist, genre in zip(rng.choices(artists, cum_weights=artist_weights, k=n),
+                             rng.choices(GENRES, cum_weights=genre_weights, k=n)):
+        words = rng.choices(WORDS, cum_weights=word_weights, k=rng.choice((1, 1, 2, 2, 3, 4, 6, 9)))
+        seconds = max(30, min(1200, int(rng.gauss(215, 60))))
+        library.append({
+            "title": " ".join(words).title(),
+            "artist": artist,
+            "album": rng.choice(albums),
+            "duration": f"{seconds // 60:02}:{seconds % 60:02}",
+            "genre": genre,
+        })
+    return library
+
+
+def make_queries(library, count, seed=0):
+    rng = random.Random(seed + 1)
+    sample = rng.choices(library, k=count)
+    return {
+        "word": [rng.choice(s["title"].split()) for s in sample],
+        "artist": [s["artist"] for s in sample],
+        "short": [s["artist"][:2] for s in sample],
+        "title": [s["title"] for s in sample],
+        "glob": [s["artist"][:3] + "*" for s in sample],
+        "misspelled": [s["artist"][:-1] + "y" for s in sample],
+        "seconds": [rng.randint(60, 400) for _ in sample],
+    }
+
+
+def baseline_scan(library, keyword):
+    # what search_song did before any index existed
+    keyword = keyword.lower().strip()
+    return [s for s in library if
+            keyword in s.get("title", "").lower() or
+            keyword in s.get("artist", "").lower() or
+            keyword in s.get("album", "").lower()]
+
+def first_page(index, keyword):
+    return stream_matches(index, normalize_query(keyword))[:10]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {f"p{int(q * 100)}_ms": round(pick(q) * 1000, 4) for q in (0.50, 0.95, 0.99)}
+
+def measure(fn, args):
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def run(size, query_count, seed):
+    library = generate_library(size, seed)
+    start = time.perf_counter()
+    index = LibraryIndex(library)
+    build = time.perf_counter() - start
+    q = make_queries(library, query_count, seed)
+
+    # the plain scan is slow at large sizes; a tenth of the queries is plenty
+    scan_queries = q["word"][:max(10, query_count // 10)]
+    paths = {
+        "scan": (lambda k: baseline_scan(library, k), scan_queries),
+        "substring": (lambda k: find_matches(index, normalize_query(k)), q["word"]),
+        "substring_short": (lambda k: find_matches(index, normalize_query(k)), q["short"][:len(scan_queries)]),
+        "first_page": (lambda k: first_page(index, k), q["word"]),
+        "by_title": (index.by_title, q["title"]),
+        "by_title_artist": (lambda s: index.by_title_artist(*s), list(zip(q["title"], q["artist"]))),
+        "phonetic": (lambda k: index.phonetic.lookup(normalize(k).split()), q["misspelled"]),
+        "glob": (lambda k: pattern_matches(index, "artist:" + k), q["glob"]),
+        "duration_range": (lambda s: index.durations.range(s, s + 30), q["seconds"]),
+        "facets_top": (lambda _: index.facets.top("genre", 10), q["seconds"]),
+    }
+
+    yield {"path": "index_build", "seconds": round(build, 3)}
+    for name, (fn, args) in paths.items():
+        yield dict(measure(fn, args), path=name, queries=len(args))
+
+
+def sort_bench(size, seed):
+    # rows are integer keys as sort_tracks sees them: ranks of titles,
+    # about a third of them distinct
+    rng = random.Random(seed)
+    keys = [rng.randrange(max(1, size // 3)) for _ in range(size)]
+    items = list(range(size))
+    parallel = ParallelSorter(threshold=0)
+    paths = {
+        "sort:builtin": lambda: sorted(items, key=keys.__getitem__),
+        "sort:radix": lambda: radix_sort(items, keys),
+        "sort:parallel": lambda: parallel.sort(items, keys),
+    }
+    if size <= TIMSORT_LIMIT:
+        paths["sort:timsort"] = lambda: TimSort.timsort([(k, i) for i, k in enumerate(keys)])
+    for name, fn in paths.items():
+        start = time.perf_counter()
+        fn()
+        yield {"path": name, "size": size, "seconds": round(time.perf_counter() - start, 3),
+               "workers": parallel.workers if name == "sort:parallel" else 1}
+
+
+def current_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search latency benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="append JSON lines here instead of stdout")
+    parser.add_argument("--sort-bench", nargs="?", const=",".join(map(str, SORT_SIZES)), metavar="SIZES",
+                        help="time the sort paths (builtin, radix, parallel, TimSort) instead")
+    args = parser.parse_args(argv)
+
+    commit = current_commit()
+    out = open(args.out, "a", encoding="utf-8") if args.out else sys.stdout
+    try:
+        if args.sort_bench:
+            results = (r for size in map(int, args.sort_bench.split(","))
+                       for r in sort_bench(size, args.seed))
+        else:
+            results = (dict(r, size=size) for size in map(int, args.sizes.split(","))
+                       for r in run(size, args.queries, args.seed))
+        for result in results:
+            result["commit"] = commit
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import math
+
+# Bloom filters for fast "definitely not seen" answers. Positions come from
+# Python's own string hash split into two halves (Kirsch-Mitzenmacher double
+# hashing), so they are only stable within one process; filters are never
+# saved to disk.
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, key):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        size = self.size
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % size
+
+    def add(self, key):
+        bits = self.bits
+        for p in self._positions(key):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for p in self._positions(key):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def full(self):
+        return self.count >= self.capacity
+
+    def nbytes(self):
+        return len(self.bits)
+
+
+class ScalableBloomFilter:
+    # Chain of filters, each `growth` times larger with an error rate
+    # `tightening` times smaller, so the overall false-positive rate stays
+    # under error_rate however many keys are added.
+    def __init__(self, initial_capacity=1024, error_rate=0.01, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        self._grow()
+
+    def _grow(self):
+        n = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** n
+        error = self.error_rate * (1 - self.tightening) * self.tightening ** n
+        self.filters.append(BloomFilter(capacity, error))
+
+    def __len__(self):
+        return sum(len(f) for f in self.filters)
+
+    def add(self, key):
+        if self.filters[-1].full():
+            self._grow()
+        self.filters[-1].add(key)
+
+    def __contains__(self, key):
+        return any(key in f for f in reversed(self.filters))
+
+    def nbytes(self):
+        return sum(f.nbytes() for f in self.filters)
+
+
+def benchmark(n=200000, error_rate=0.01):
+    import sys
+    import time
+
+    existing = [f"title {i}\x1fartist {i % 997}" for i in range(n)]
+    incoming = [f"title {i}\x1fartist {i % 997}" for i in range(n, 2 * n)]
+
+    bloom = ScalableBloomFilter(error_rate=error_rate)
+    plain = set()
+    for key in existing:
+        bloom.add(key)
+        plain.add(key)
+
+    start = time.perf_counter()
+    false_positives = sum(1 for key in incoming if key in bloom)
+    bloom_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sum(1 for key in incoming if key in plain)
+    set_time = time.perf_counter() - start
+
+    set_bytes = sys.getsizeof(plain) + sum(sys.getsizeof(k) for k in plain)
+    print(f"{n} keys, target error rate {error_rate}")
+    print(f"bloom: {bloom.nbytes() / 1024:10.1f} KiB  {n / bloom_time:12.0f} lookups/s  "
+          f"false positives {false_positives / n:.4f}")
+    print(f"set:   {set_bytes / 1024:10.1f} KiB  {n / set_time:12.0f} lookups/s")
+
+
+if __name__ == '__main__':
+    benchmark()
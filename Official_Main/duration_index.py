@@ -0,0 +1,38 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class DurationIndex:
+    # (seconds, track id) pairs kept sorted, so range and nearest queries
+    # are a bisect plus the k rows returned
+    def __init__(self):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, tid, seconds):
+        insort(self.entries, (seconds, tid))
+
+    def remove(self, tid, seconds):
+        i = bisect_left(self.entries, (seconds, tid))
+        if i < len(self.entries) and self.entries[i] == (seconds, tid):
+            del self.entries[i]
+
+    def range(self, lo, hi):
+        i = bisect_left(self.entries, (lo, -1))
+        j = bisect_right(self.entries, (hi, float("inf")))
+        return [tid for _, tid in self.entries[i:j]]
+
+    def nearest(self, seconds, k=1):
+        entries = self.entries
+        right = bisect_left(entries, (seconds, -1))
+        left = right - 1
+        found = []
+        while len(found) < k and (left >= 0 or right < len(entries)):
+            if right >= len(entries) or (left >= 0 and seconds - entries[left][0] <= entries[right][0] - seconds):
+                found.append(entries[left][1])
+                left -= 1
+            else:
+                found.append(entries[right][1])
+                right += 1
+        return found
@@ -0,0 +1,140 @@
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+from operator import itemgetter
+from sorting import sort_key
+
+# Sorting catalogs that do not fit in memory. Records are read one JSON
+# object per line, gathered into chunks of at most memory_mb, each chunk is
+# sorted and spilled to a temporary run file as [key, song] lines, and the
+# runs are combined with a k-way heap merge. Keys are the same lowercased
+# text or seconds sort_tracks orders by, but are not cached, so memory stays
+# within one chunk. heapq.merge is stable across its inputs and the runs are
+# written in input order, so equal keys keep their input order. With
+# more than MAX_FANIN runs, groups of runs are merged into longer ones first
+# so the number of open files stays bounded.
+#
+#   python external_sort.py CATALOG.jsonl SORTED.jsonl --mode artist --memory-mb 256
+
+MEMORY_MB = 256
+MAX_FANIN = 64
+
+
+def record_size(song):
+    # rough in-memory footprint of one parsed record
+    return sys.getsizeof(song) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in song.items())
+
+def read_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def write_run(directory, rows):
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+
+def chunks(records, memory_mb):
+    budget = memory_mb * 1024 * 1024
+    chunk, used = [], 0
+    for song in records:
+        chunk.append(song)
+        used += record_size(song)
+        if used >= budget:
+            yield chunk
+            chunk, used = [], 0
+    if chunk:
+        yield chunk
+
+def merge_runs(paths, progress=None, total=0):
+    # -> [key, song] rows in order; run files are removed once read
+    readers = [read_run(p) for p in paths]
+    done = 0
+    try:
+        for row in heapq.merge(*readers, key=itemgetter(0)):
+            done += 1
+            if progress and done % 100000 == 0:
+                progress("merge", done, total)
+            yield row
+    finally:
+        for reader in readers:
+            reader.close()
+        for p in paths:
+            os.remove(p)
+    if progress:
+        progress("merge", done, total)
+
+
+def sorted_records(records, mode="title", memory_mb=MEMORY_MB, progress=None, tmpdir=None):
+    # Generator of songs in sort order. Wrap it in a ResultCursor to page
+    # through the result without writing it anywhere.
+    key = sort_key(mode.lower())
+    with tempfile.TemporaryDirectory(prefix="sort-", dir=tmpdir) as directory:
+        runs = []
+        total = 0
+        for chunk in chunks(records, memory_mb):
+            total += len(chunk)
+            rows = sorted(([key(s), s] for s in chunk), key=itemgetter(0))
+            del chunk
+            runs.append(write_run(directory, rows))
+            del rows
+            if progress:
+                progress("runs", len(runs), total)
+
+        while len(runs) > MAX_FANIN:
+            runs = [write_run(directory, merge_runs(runs[i:i + MAX_FANIN]))
+                    for i in range(0, len(runs), MAX_FANIN)]
+            if progress:
+                progress("runs", len(runs), total)
+
+        merged = merge_runs(runs, progress, total)
+        try:
+            for _, song in merged:
+                yield song
+        finally:
+            merged.close()
+
+def sort_file(src, dst, mode="title", memory_mb=MEMORY_MB, progress=None, tmpdir=None):
+    count = 0
+    with open(dst, "w", encoding="utf-8") as out:
+        for song in sorted_records(read_records(src), mode, memory_mb, progress, tmpdir):
+            out.write(json.dumps(song, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def print_progress(stage, done, total):
+    if stage == "runs":
+        print(f"\r📦 {done} sorted runs, {total:,} records read", end="", file=sys.stderr)
+    else:
+        print(f"\r🔀 merged {done:,}/{total:,} records", end="", file=sys.stderr)
+        if done == total:
+            print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sort a JSON-lines catalog larger than memory")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--mode", default="title", choices=("title", "artist", "album", "duration"))
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_MB)
+    parser.add_argument("--tmpdir", help="where sorted runs are spilled (default: system temp)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = sort_file(args.src, args.dst, args.mode, args.memory_mb, print_progress, args.tmpdir)
+    print(f"✅ Sorted {count:,} records by {args.mode} in {time.perf_counter() - start:.1f}s")
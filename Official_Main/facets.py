@@ -0,0 +1,68 @@
+from collections import Counter
+from normalize import normalize
+
+FACETS = ("genre", "artist", "album")
+
+
+class FacetCounts:
+    # Per-facet counters plus one nested counter per (parent, child) facet
+    # pair, e.g. ("genre", "artist") -> {genre key: Counter(artist key)},
+    # all updated on add/remove so browsing never rescans the library.
+    # Counts are keyed by normalized value; labels keep the first spelling seen.
+    # The track ids under each value are kept too, for listing a drill-down.
+    def __init__(self):
+        self.counts = {f: Counter() for f in FACETS}
+        self.labels = {f: {} for f in FACETS}
+        self.members = {f: {} for f in FACETS}    # facet -> {key: {track ids}}
+        self.nested = {(p, c): {} for p in FACETS for c in FACETS if p != c}
+
+    def add(self, tid, keys, song):
+        for f in FACETS:
+            if keys[f]:
+                self.counts[f][keys[f]] += 1
+                self.labels[f].setdefault(keys[f], song.get(f, ""))
+                self.members[f].setdefault(keys[f], set()).add(tid)
+        for (p, c), table in self.nested.items():
+            if keys[p] and keys[c]:
+                table.setdefault(keys[p], Counter())[keys[c]] += 1
+
+    def remove(self, tid, keys):
+        for f in FACETS:
+            if keys[f]:
+                _decrement(self.counts[f], keys[f])
+                if keys[f] not in self.counts[f]:
+                    self.labels[f].pop(keys[f], None)
+                ids = self.members[f].get(keys[f])
+                if ids is not None:
+                    ids.discard(tid)
+                    if not ids:
+                        del self.members[f][keys[f]]
+        for (p, c), table in self.nested.items():
+            inner = table.get(keys[p])
+            if inner is not None and keys[c]:
+                _decrement(inner, keys[c])
+                if not inner:
+                    del table[keys[p]]
+
+    def count(self, facet, value):
+        return self.counts[facet][normalize(value)]
+
+    def top(self, facet, n=None):
+        return self._labelled(facet, self.counts[facet].most_common(n))
+
+    def ids(self, facet, value):
+        # track ids with this value, in insertion order
+        return sorted(self.members[facet].get(normalize(value), ()))
+
+    def drill(self, parent, value, child, n=None):
+        inner = self.nested[(parent, child)].get(normalize(value), Counter())
+        return self._labelled(child, inner.most_common(n))
+
+    def _labelled(self, facet, pairs):
+        return [(self.labels[facet][k], n) for k, n in pairs]
+
+
+def _decrement(counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
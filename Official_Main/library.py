@@ -1,6 +1,13 @@
+import json
 from ui import print_boxed, print_menu, prompt_choice, show_help
-from sorting import sort_tracks
 from ui import display_tracks
+from search import search_tracks, ResultCursor
+from sorting import lazy_sorted
+from search_index import get_index
+from normalize import normalize
+from sorted_views import VIEW_MODES
+
+SONG_FIELDS = ("title", "artist", "album", "duration", "genre")
 
 def add_song(library):
     print_boxed("Add Song")
@@ -18,10 +25,10 @@ def add_song(library):
     duration = get_input("Duration (MM:SS)")
     genre = get_input("Genre")
 
-    for song in library:
-        if song["title"].lower() == title.lower() and song["artist"].lower() == artist.lower():
-            print(f"\n❌ Duplicate song detected! '{title}' by '{artist}' already exists.\n")
-            return
+    index = get_index(library)
+    if index.by_title_artist(title, artist) is not None:
+        print(f"\n❌ Duplicate song detected! '{title}' by '{artist}' already exists.\n")
+        return
         
     new_song = {
         "title": title,
@@ -32,6 +39,7 @@ def add_song(library):
     }
 
     library.append(new_song)
+    index.add(new_song)
     print(f"\n🎵 Song '{title}' added successfully!\n")
 
 def view_songs(library):
@@ -41,8 +49,14 @@ def view_songs(library):
         print("❌ No songs yet. Use option 1 to add songs.\n")
         return
 
+    # The first time a column is picked it is shown through a lazy top-k
+    # cursor, so the first page does not wait for a full sort; picking it
+    # again builds (or reuses) the index's maintained view for that column.
+    # The library list itself keeps its order.
+    shown = library
+    picked = set()
     while True:
-        display_tracks("Library View", library)
+        display_tracks("Library View", shown)
         sort_menu = [
             ("1", "Sort by Title"),
             ("2", "Sort by Artist"),
@@ -54,14 +68,14 @@ def view_songs(library):
         choice = prompt_choice("Sort Library")
 
         c = choice.upper()
-        if c == "1":
-            sort_tracks(library, "title")
-        elif c == "2":
-            sort_tracks(library, "artist")
-        elif c == "3":
-            sort_tracks(library, "album")
-        elif c == "4":
-            sort_tracks(library, "duration")
+        if c in ("1", "2", "3", "4"):
+            mode = VIEW_MODES[int(c) - 1]
+            index = get_index(library)
+            if mode in index.views or mode in picked:
+                shown = index.view(mode)
+            else:
+                shown = ResultCursor(lazy_sorted(library, mode), total=len(library))
+            picked.add(mode)
         elif c == "B":
             return
         elif c in ("H","?"):
@@ -71,14 +85,9 @@ def view_songs(library):
 
 def search_song(library):
     print_boxed("Search Songs")
-    keyword = input("Search (title/artist/album): ").lower().strip()
+    keyword = input("Search (title/artist/album, Rad*head, /regex/, or MM:SS-MM:SS): ").strip()
     
-    results = [
-        s for s in library if 
-        keyword in s.get("title", "").lower() or
-        keyword in s.get("artist", "").lower() or
-        keyword in s.get("album", "").lower()
-    ]
+    results = search_tracks(library, keyword)
 
     if not results:
         print("❌ No results found.\n")
@@ -93,9 +102,10 @@ def delete_song(library):
         print("❌ Library is empty.")
         return library
 
-    title = input("Enter track title to delete: ").strip().lower()
+    title = input("Enter track title to delete: ")
 
-    matches = [t for t in library if t["title"].lower() == title]
+    index = get_index(library)
+    matches = index.by_title(title)
 
     if not matches:
         print("❌ No track with that title found.")
@@ -103,6 +113,7 @@ def delete_song(library):
 
     if len(matches) == 1:
         library.remove(matches[0])
+        index.remove(matches[0])
         print("✅ Track deleted successfully.")
         return library
 
@@ -114,6 +125,7 @@ def delete_song(library):
         choice = int(input("Select which track to delete: "))
         if 1 <= choice <= len(matches):
             library.remove(matches[choice - 1])
+            index.remove(matches[choice - 1])
             print("✅ Track deleted successfully.")
         else:
             print("❌ Invalid option.")
@@ -121,3 +133,71 @@ def delete_song(library):
         print("❌ Invalid input.")
 
     return library
+
+def browse_genres(library):
+    print_boxed("Browse by Genre")
+    index = get_index(library)
+    facets = index.facets
+    genres = facets.top("genre", 10)
+
+    if not genres:
+        print("❌ No genres yet. Use option 1 to add songs.\n")
+        return
+
+    genre_menu = [(str(i), f"{label} ({count} songs)") for i, (label, count) in enumerate(genres, 1)]
+    print_menu(genre_menu + [("B", "Back")])
+    choice = prompt_choice("Pick a genre")
+
+    if choice.upper() == "B":
+        return
+    try:
+        genre = genres[int(choice) - 1][0]
+    except (ValueError, IndexError):
+        print("❌ Invalid option.\n")
+        return
+
+    print_boxed(f"Top Artists in {genre}")
+    artists = facets.drill("genre", genre, "artist", 10)
+    print_menu([(str(i), f"{label} ({count} songs)") for i, (label, count) in enumerate(artists, 1)])
+
+    display_tracks(genre, [index.tracks[tid] for tid in facets.ids("genre", genre)])
+    print()
+
+def import_songs(library, songs):
+    index = get_index(library)
+    added = skipped = 0
+
+    for song in songs:
+        title = str(song.get("title", "")).strip()
+        artist = str(song.get("artist", "")).strip()
+        if not title or not artist:
+            skipped += 1
+            continue
+        if index.title_artist_ids(normalize(title), normalize(artist)):
+            skipped += 1
+            continue
+
+        new_song = {f: str(song.get(f, "")).strip() for f in SONG_FIELDS}
+        library.append(new_song)
+        index.add(new_song)
+        added += 1
+
+    return added, skipped
+
+def import_from_file(library):
+    print_boxed("Import Songs")
+    path = input("JSON file to import: ").strip()
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            songs = json.load(f)
+    except (OSError, ValueError):
+        print("❌ Could not read that file.\n")
+        return
+
+    if not isinstance(songs, list):
+        print("❌ The file must contain a list of songs.\n")
+        return
+
+    added, skipped = import_songs(library, [s for s in songs if isinstance(s, dict)])
+    print(f"\n🎵 Imported {added} songs, skipped {skipped} duplicates or incomplete entries.\n")
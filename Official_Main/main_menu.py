@@ -1,13 +1,15 @@
 from data_storage import load_data, save_data
 from ui import print_boxed, print_menu, prompt_choice, show_help
-from library import add_song, view_songs, delete_song, search_song
+from library import add_song, view_songs, delete_song, search_song, browse_genres, import_from_file
 from playlist import Playlist
 from queueue import queue_add, shuffle_play, play_queue, view_queue
+from search_index import get_index
 
 def main():
     library = load_data("library.json")
     playlists = load_data("playlists.json")
     queue = load_data("queue.json")
+    get_index(library)  # precompute search keys once at load
 
     # if "items" not in queue:
     #     queue["items"] = []
@@ -43,6 +45,8 @@ def main():
                 ("2", "Delete Songs"),
                 ("3", "View Songs"),
                 ("4", "Search Songs"),
+                ("5", "Browse by Genre"),
+                ("6", "Import Songs"),
                 ("B", "Back"),
                 ("H", "Help")
             ]
@@ -70,6 +74,10 @@ def main():
                     view_songs(library)
                 elif c == "4":
                     search_song(library)
+                elif c == "5":
+                    browse_genres(library)
+                elif c == "6":
+                    import_from_file(library)
                 elif c == "B":
                     break
                 else:
@@ -80,6 +88,7 @@ def main():
                 ("1", "Create Playlist"),
                 ("2", "Add to Playlist"),
                 ("3", "View a Playlist"),
+                ("4", "Generate Playlist by Duration"),
                 ("B", "Back"),
                 ("H", "Help")
             ]
@@ -104,6 +113,8 @@ def main():
                     Playlist.add_to_playlist(library, playlists)
                 elif c == "3":
                     Playlist.view_playlist(playlists)
+                elif c == "4":
+                    Playlist.generate_playlist(library, playlists)
                 elif c == "B":
                     break
                 else:
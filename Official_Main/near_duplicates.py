@@ -0,0 +1,125 @@
+import random
+import re
+import sys
+import zlib
+from normalize import normalize
+
+# MinHash signatures over character shingles of "title artist", bucketed
+# with LSH bands: tracks sharing any band bucket are compared, everything
+# else is never paired, so the work stays close to linear in the catalog.
+
+SHINGLE = 3
+NUM_HASHES = 64
+BANDS = 16                    # 16 bands x 4 rows: pairs with ~0.5+ similarity collide
+THRESHOLD = 0.5
+
+# "(Remastered)", "- 2017 Remaster", "[Live]" and the like. Brackets, dash
+# suffixes and years only count as noise next to one of these tags, so
+# "1999", "Love (Part 2)" and "Song - Reprise" keep what tells them apart.
+_TAG = r"(?:remaster(?:ed)?|live|version|edit|mono|stereo|deluxe)"
+_NOISE_RE = re.compile(rf"[\(\[][^\)\]]*\b{_TAG}\b[^\)\]]*[\)\]]"
+                       rf"|\s-\s[^-]*\b{_TAG}\b.*$"
+                       rf"|\b(?:19|20)\d\d\s+{_TAG}\b|\b{_TAG}\s+(?:19|20)\d\d\b"
+                       r"|\bremaster(?:ed)?\b")
+_NUMBER_RE = re.compile(r"\d+")
+_PRIME = (1 << 61) - 1
+
+_rng = random.Random(2017)
+_COEFFS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+
+def clean_title(title):
+    # a title that is nothing but noise ("Live", "(Remastered)") stays as is
+    title = normalize(title)
+    return " ".join(_NOISE_RE.sub(" ", title).split()) or title
+
+def shingles(text, salt=0):
+    text = f" {text} "
+    return {zlib.crc32(text[i:i + SHINGLE].encode("utf-8"), salt)
+            for i in range(max(1, len(text) - SHINGLE + 1))}
+
+def minhash(features):
+    return [min((a * f + b) % _PRIME for f in features) for a, b in _COEFFS]
+
+def similarity(sig_a, sig_b):
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+def track_features(song, clean=True):
+    # artist shingles are salted so they never collide with title ones
+    title = clean_title(song.get("title", "")) if clean else normalize(song.get("title", ""))
+    return shingles(title) | shingles(normalize(song.get("artist", "")), salt=1)
+
+
+def find_near_duplicates(library, threshold=THRESHOLD):
+    signatures = [minhash(track_features(s)) for s in library]
+    # numbers left after cleaning ("Part 2", "1999") tell tracks apart
+    numbers = [_NUMBER_RE.findall(clean_title(s.get("title", ""))) for s in library]
+    rows = NUM_HASHES // BANDS
+
+    buckets = {}
+    for i, sig in enumerate(signatures):
+        for band in range(BANDS):
+            key = (band, tuple(sig[band * rows:(band + 1) * rows]))
+            buckets.setdefault(key, []).append(i)
+
+    # union-find over candidate pairs that pass the similarity check
+    parent = list(range(len(library)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        first = members[0]
+        for other in members[1:]:
+            pair = (first, other)
+            if pair in checked:
+                continue
+            checked.add(pair)
+            if numbers[first] == numbers[other] and similarity(signatures[first], signatures[other]) >= threshold:
+                parent[find(other)] = find(first)
+
+    groups = {}
+    for i in range(len(library)):
+        groups.setdefault(find(i), []).append(i)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        # the reported score compares the titles as written, so a remaster
+        # shows up as close but not identical
+        keep = minhash(track_features(library[members[0]], clean=False))
+        clusters.append({
+            "keep": library[members[0]],
+            "duplicates": [
+                (library[i], round(similarity(keep, minhash(track_features(library[i], clean=False))), 2))
+                for i in members[1:]
+            ],
+        })
+    return clusters
+
+
+def merge_report(clusters):
+    lines = [f"{len(clusters)} probable duplicate groups"]
+    for n, cluster in enumerate(clusters, 1):
+        keep = cluster["keep"]
+        lines.append(f"\n[{n}] keep: {keep.get('title', '')} – {keep.get('artist', '')} ({keep.get('duration', '')})")
+        for song, score in cluster["duplicates"]:
+            lines.append(f"     merge: {song.get('title', '')} – {song.get('artist', '')} "
+                         f"({song.get('duration', '')})  similarity {score:.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    from batch_search import load_json
+
+    if len(sys.argv) != 2:
+        print("usage: python near_duplicates.py LIBRARY.json")
+        sys.exit(1)
+    print(merge_report(find_near_duplicates(load_json(sys.argv[1]))))
@@ -0,0 +1,10 @@
+import unicodedata
+from functools import lru_cache
+
+# NFKD + accent stripping + casefold + whitespace collapse, so that
+# "Beyoncé", "BEYONCE" and " beyonce " all compare equal.
+@lru_cache(maxsize=65536)
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
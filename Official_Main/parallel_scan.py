@@ -0,0 +1,128 @@
+import atexit
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PARALLEL_THRESHOLD = 100000
+CHUNKS_PER_WORKER = 4
+# Changes shipped as deltas before the workers are restarted with a fresh
+# copy of the keys: 1% of the library, at least 1000 tracks.
+REBUILD_FRACTION = 0.01
+REBUILD_MIN = 1000
+
+# Each worker receives the chunks once, through the pool initializer
+# (inherited on fork, pickled once per worker on spawn). Queries then only
+# send a chunk number and the predicate. Adds and deletes after that travel
+# as numbered deltas with every query: a worker applies the ones it has not
+# seen yet (added tracks join the last chunk, removed ones are filtered
+# out), so editing the library does not restart the pool. Every query
+# carries the whole delta log, so once it grows past REBUILD_FRACTION of
+# the library the pool is rebuilt on the next scan and the log starts over.
+_chunks = []
+_removed = set()
+_applied = 0
+
+def _load_chunks(chunks):
+    global _chunks, _removed, _applied
+    _chunks = chunks
+    _removed = set()
+    _applied = 0
+
+def _apply(deltas):
+    global _applied
+    for seq, removed, added_ids, added_keys in deltas:
+        if seq <= _applied:
+            continue
+        _removed.update(removed)
+        ids, keys = _chunks[-1]
+        ids.extend(added_ids)
+        keys.extend(added_keys)
+        _applied = seq
+
+def _scan_chunk(chunk_no, predicate, deltas):
+    _apply(deltas)
+    ids, keys = _chunks[chunk_no]
+    removed = _removed
+    return [tid for tid, k in zip(ids, keys) if predicate(k) and tid not in removed]
+
+
+class ParallelScanner:
+    def __init__(self, workers=None, threshold=PARALLEL_THRESHOLD):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self._pool = None
+        self._index = None          # weak reference to the index shipped
+        self._version = None
+        self._chunk_count = 0
+        self._shipped = set()       # track ids the workers know about
+        self._deltas = []
+        self._changed = 0
+
+    def enabled_for(self, index):
+        return self.workers >= 2 and len(index) >= self.threshold
+
+    def scan(self, index, predicate):
+        # predicate is called with each track's normalized keys and must be
+        # picklable (a module-level function or class)
+        if not self.enabled_for(index):
+            return serial_scan(index, predicate)
+
+        try:
+            pool = self._pool_for(index)
+            n = self._chunk_count
+            parts = pool.map(_scan_chunk, range(n), [predicate] * n, [self._deltas] * n)
+            return [tid for part in parts for tid in part]
+        except BrokenProcessPool:
+            self.shutdown()
+            return serial_scan(index, predicate)
+
+    def _pool_for(self, index):
+        if self._pool is not None and self._index() is index:
+            if self._version != index.version:
+                self._sync(index)
+            if self._changed <= max(REBUILD_MIN, len(index) * REBUILD_FRACTION):
+                return self._pool
+        self.shutdown()
+
+        ids = list(index.keys)
+        keys = list(index.keys.values())
+        size = max(1, -(-len(ids) // (self.workers * CHUNKS_PER_WORKER)))
+        chunks = [(ids[i:i + size], keys[i:i + size]) for i in range(0, len(ids), size)]
+
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_load_chunks, initargs=(chunks,))
+        self._chunk_count = len(chunks)
+        self._index = weakref.ref(index)
+        self._version = index.version
+        self._shipped = set(ids)
+        return self._pool
+
+    def _sync(self, index):
+        # one delta with everything added or removed since the last query;
+        # track ids only grow, so new ones sort after everything shipped
+        current = index.keys
+        removed = list(self._shipped - current.keys())
+        added = sorted(current.keys() - self._shipped)
+        self._shipped.difference_update(removed)
+        self._shipped.update(added)
+        self._deltas.append((len(self._deltas) + 1, removed, added, [current[t] for t in added]))
+        self._changed += len(removed) + len(added)
+        self._version = index.version
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        self._pool = None
+        self._index = None
+        self._version = None
+        self._shipped = set()
+        self._deltas = []
+        self._changed = 0
+
+
+def serial_scan(index, predicate):
+    return [tid for tid, keys in index.keys.items() if predicate(keys)]
+
+
+scanner = ParallelScanner()
+atexit.register(scanner.shutdown)
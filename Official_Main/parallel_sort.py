@@ -0,0 +1,93 @@
+import os
+import random
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Off by default: it has only been measured on a single core, where it is
+# slower than the serial paths. Opt in with a row count, either through the
+# environment (MUSIC_PARALLEL_SORT_THRESHOLD=1000000) or per call through
+# sort_tracks(..., parallel_threshold=N).
+THRESHOLD_ENV = "MUSIC_PARALLEL_SORT_THRESHOLD"
+OVERSAMPLE = 32
+
+def threshold_from_env():
+    value = os.environ.get(THRESHOLD_ENV, "").strip()
+    try:
+        return int(value) if value else None
+    except ValueError:
+        print(f"❌ Ignoring {THRESHOLD_ENV}={value!r}: not a row count.")
+        return None
+
+PARALLEL_SORT_THRESHOLD = threshold_from_env()
+
+# Sample sort for very long track lists. Each (key, position) pair is packed
+# into one 64-bit int, key * n + position, so workers sort plain machine ints
+# and equal keys stay in input order. Two rounds over the pool:
+#   1. every worker sorts one contiguous slice and cuts it at the splitters
+#      (picked from a random sample, so partitions come out about even)
+#   2. worker j merges the j-th piece of every slice
+# The partitions are disjoint and ordered, so concatenating them is the
+# result. Data crosses process boundaries as raw array bytes. The pool only
+# lives for one sort, so nothing stays running between sorts.
+
+def _sort_and_cut(data, splitters):
+    values = array("q")
+    values.frombytes(data)
+    values = sorted(values)
+    cuts = [0] + [bisect_right(values, s) for s in splitters] + [len(values)]
+    return [array("q", values[lo:hi]).tobytes() for lo, hi in zip(cuts, cuts[1:])]
+
+def _merge_pieces(pieces):
+    values = array("q")
+    for piece in pieces:
+        values.frombytes(piece)
+    # already-sorted pieces: list.sort only gallops through the merges
+    values = sorted(values)
+    return array("q", values).tobytes()
+
+
+class ParallelSorter:
+    def __init__(self, workers=None, threshold=PARALLEL_SORT_THRESHOLD):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+
+    def enabled_for(self, n, threshold=None):
+        # threshold overrides the configured one for a single call
+        threshold = self.threshold if threshold is None else threshold
+        return threshold is not None and self.workers >= 2 and n >= threshold
+
+    def order(self, keys):
+        # positions of keys in stable sorted order; keys are ints
+        n = len(keys)
+        if n == 0:
+            return []
+        lo = min(keys)
+        if (max(keys) - lo + 1) * n >= 1 << 63:
+            return sorted(range(n), key=keys.__getitem__)
+        packed = array("q", [(k - lo) * n + i for i, k in enumerate(keys)])
+
+        workers = self.workers
+        sample = sorted(random.sample(range(n), min(n, workers * OVERSAMPLE)))
+        sample = sorted(packed[i] for i in sample)
+        splitters = sample[OVERSAMPLE - 1::OVERSAMPLE][:workers - 1]
+        size = -(-n // workers)
+        slices = [packed[i:i + size].tobytes() for i in range(0, n, size)]
+
+        try:
+            with ProcessPoolExecutor(workers) as pool:
+                cut = list(pool.map(_sort_and_cut, slices, [splitters] * len(slices)))
+                parts = pool.map(_merge_pieces, [[pieces[j] for pieces in cut] for j in range(len(splitters) + 1)])
+                result = array("q")
+                for part in parts:
+                    result.frombytes(part)
+        except BrokenProcessPool:
+            result = sorted(packed)
+        return [v % n for v in result]
+
+    def sort(self, items, keys):
+        return [items[i] for i in self.order(keys)]
+
+
+sorter = ParallelSorter()
@@ -0,0 +1,136 @@
+import fnmatch
+import re
+from functools import lru_cache
+from normalize import normalize
+from search_index import FIELDS, KEY_FIELDS
+from parallel_scan import scanner
+
+# Query forms, optionally prefixed by a field ("artist:Rad*head"):
+#   Rad*head     glob, matched against the whole field (* and ? wildcards)
+#   /^let d/     regular expression, searched anywhere in the field
+# Both run case-insensitively against the normalized keys, so accents in a
+# regex must be left out ("beyonce", not "beyoncé").
+
+_QUERY_RE = re.compile(r"^(?:(?P<field>\w+):)?(?P<pattern>.+)$", re.S)
+_GLOB_SPLIT_RE = re.compile(r"\*|\?|\[[^\]]*\]")
+MIN_LITERAL = 3
+
+
+def is_pattern_query(raw):
+    parsed = _split_field(raw.strip())
+    if parsed is None:
+        return False
+    _, pattern = parsed
+    return (len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")) or "*" in pattern
+
+def _split_field(raw):
+    m = _QUERY_RE.match(raw)
+    if m is None:
+        return None
+    field = m.group("field")
+    if field and normalize(field) in KEY_FIELDS:
+        return (normalize(field),), m.group("pattern").strip()
+    return FIELDS, raw
+
+
+@lru_cache(maxsize=256)
+def compile_query(raw):
+    # -> (predicate, required literals); cached per query text
+    fields, pattern = _split_field(raw.strip())
+    if pattern.startswith("/") and pattern.endswith("/") and len(pattern) > 2:
+        source = pattern[1:-1]
+        regex = re.compile(source, re.IGNORECASE)
+        return PatternPredicate(fields, regex, full=False), regex_literals(source)
+
+    glob = normalize(pattern)
+    literals = [p for p in _GLOB_SPLIT_RE.split(glob) if len(p) >= MIN_LITERAL]
+    regex = re.compile(fnmatch.translate(glob), re.IGNORECASE)
+    return PatternPredicate(fields, regex, full=True), literals
+
+def regex_literals(source):
+    # Conservative: literal runs outside any group that every match must
+    # contain. Alternation anywhere means nothing is guaranteed.
+    if "|" in source:
+        return []
+    runs, run = [], ""
+    depth = 0
+    i = 0
+    while i < len(source):
+        c = source[i]
+        if c == "\\" and i + 1 < len(source):
+            nxt = source[i + 1]
+            if nxt.isalnum() or depth:
+                runs.append(run)
+                run = ""
+            else:
+                run += nxt
+            i += 2
+            continue
+        if c in "()":
+            depth += 1 if c == "(" else -1
+            runs.append(run)
+            run = ""
+        elif depth:
+            pass
+        elif c in "*?":
+            # the previous character was optional
+            run = run[:-1]
+            runs.append(run)
+            run = ""
+        elif c == "{":
+            # a repeat count: the previous character may occur zero times,
+            # and nothing up to the matching "}" is literal text
+            end = source.find("}", i + 1)
+            run = run[:-1]
+            runs.append(run)
+            run = ""
+            i = len(source) if end < 0 else end
+        elif c == "+":
+            runs.append(run)
+            run = ""
+        elif c == "[":
+            # skip the class; a "]" right after "[" or "[^" is part of it
+            j = i + 1
+            if source[j:j + 1] == "^":
+                j += 1
+            if source[j:j + 1] == "]":
+                j += 1
+            end = source.find("]", j)
+            runs.append(run)
+            run = ""
+            i = len(source) if end < 0 else end
+        elif c in ".^$":
+            runs.append(run)
+            run = ""
+        else:
+            run += c
+        i += 1
+    runs.append(run)
+    return [normalize(r) for r in runs if len(normalize(r)) >= MIN_LITERAL]
+
+
+class PatternPredicate:
+    # full=True anchors at the start too (globs match the whole field)
+    def __init__(self, fields, regex, full):
+        self.fields = fields
+        self.regex = regex
+        self.full = full
+
+    def __call__(self, keys):
+        test = self.regex.match if self.full else self.regex.search
+        return any(test(keys[f]) for f in self.fields)
+
+
+def pattern_matches(index, raw):
+    predicate, literals = compile_query(raw)
+
+    candidates = None
+    for literal in literals:
+        found = index.substring_candidates(literal)
+        if found is not None:
+            candidates = found if candidates is None else candidates & found
+
+    if candidates is None:
+        return scanner.scan(index, predicate)
+    keys = index.keys
+    return [tid for tid in sorted(candidates) if predicate(keys[tid])]
@@ -0,0 +1,142 @@
+VOWELS = set("aeiou")
+MIN_CODE = 2            # one-letter codes ("K" for "qqqq") match far too much
+FRONT_VOWELS = set("eiy")
+
+# Simplified Metaphone over a normalized token: "mitsky" and "mitski" both
+# become "MTSK", "ashniko" and "ashnikko" both "AXNK".
+def phonetic_code(token):
+    w = "".join(c for c in token if "a" <= c <= "z")
+    if not w:
+        return ""
+    if w[:2] in ("kn", "gn", "pn", "wr", "ae"):
+        w = w[1:]
+    elif w[0] == "x":
+        w = "s" + w[1:]
+    elif w[:2] == "wh":
+        w = "w" + w[2:]
+
+    code = []
+    n = len(w)
+    i = 0
+    while i < n:
+        c = w[i]
+        prev = w[i - 1] if i > 0 else ""
+        nxt = w[i + 1] if i + 1 < n else ""
+        nxt2 = w[i + 2] if i + 2 < n else ""
+
+        if c == prev and c != "c":
+            i += 1
+            continue
+
+        if c in VOWELS:
+            if i == 0:
+                code.append(c.upper())
+        elif c == "b":
+            if not (prev == "m" and i == n - 1):
+                code.append("B")
+        elif c == "c":
+            if nxt == "i" and nxt2 == "a":
+                code.append("X")
+            elif nxt == "h":
+                code.append("K" if prev == "s" else "X")
+                i += 1
+            elif nxt in FRONT_VOWELS:
+                if prev != "s":
+                    code.append("S")
+            else:
+                code.append("K")
+        elif c == "d":
+            if nxt == "g" and nxt2 in FRONT_VOWELS:
+                code.append("J")
+                i += 1
+            else:
+                code.append("T")
+        elif c == "g":
+            if nxt == "h" and nxt2 and nxt2 not in VOWELS:
+                i += 1
+            elif nxt == "n" and (i + 2 == n or w[i + 2:] == "ed"):
+                pass
+            elif nxt in FRONT_VOWELS:
+                code.append("J")
+            else:
+                code.append("K")
+        elif c == "h":
+            if nxt in VOWELS and prev not in VOWELS:
+                code.append("H")
+        elif c == "k":
+            if prev != "c":
+                code.append("K")
+        elif c == "p":
+            if nxt == "h":
+                code.append("F")
+                i += 1
+            else:
+                code.append("P")
+        elif c == "q":
+            code.append("K")
+        elif c == "s":
+            if nxt == "h":
+                code.append("X")
+                i += 1
+            elif nxt == "i" and nxt2 in ("o", "a"):
+                code.append("X")
+            else:
+                code.append("S")
+        elif c == "t":
+            if nxt == "i" and nxt2 in ("o", "a"):
+                code.append("X")
+            elif nxt == "h":
+                code.append("0")
+                i += 1
+            elif not (nxt == "c" and nxt2 == "h"):
+                code.append("T")
+        elif c == "v":
+            code.append("F")
+        elif c in "wy":
+            if nxt in VOWELS:
+                code.append(c.upper())
+        elif c == "x":
+            code.append("KS")
+        elif c == "z":
+            code.append("S")
+        else:
+            code.append(c.upper())
+        i += 1
+
+    return "".join(code)
+
+
+def _codes(tokens):
+    return [c for c in map(phonetic_code, tokens) if len(c) >= MIN_CODE]
+
+
+class PhoneticIndex:
+    # phonetic code -> {track id: number of tokens with that code}; codes
+    # shorter than MIN_CODE are neither indexed nor looked up
+    def __init__(self):
+        self.codes = {}
+
+    def add(self, tid, tokens):
+        for code in _codes(tokens):
+            ids = self.codes.setdefault(code, {})
+            ids[tid] = ids.get(tid, 0) + 1
+
+    def remove(self, tid, tokens):
+        for code in _codes(tokens):
+            ids = self.codes.get(code)
+            if ids is None or tid not in ids:
+                continue
+            ids[tid] -= 1
+            if not ids[tid]:
+                del ids[tid]
+            if not ids:
+                del self.codes[code]
+
+    def lookup(self, tokens):
+        # track ids that sound like every query token, in insertion order
+        codes = set(_codes(tokens))
+        if not codes:
+            return []
+        sets = sorted((self.codes.get(c, {}).keys() for c in codes), key=len)
+        found = set(sets[0]).intersection(*sets[1:])
+        return sorted(found)
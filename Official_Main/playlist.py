@@ -1,5 +1,8 @@
 from ui import print_boxed, display_tracks, print_menu, prompt_choice, show_help, terminal_width, sort_playlist
-from sorting import sort_tracks
+from sorting import sort_tracks, duration_to_seconds
+from search_index import get_index
+from search import tracks_in_duration
+from normalize import normalize
 
 class Playlist:
     def create_playlist(playlists):
@@ -24,27 +27,51 @@ class Playlist:
             print("❌ Playlist does not exist.\n")
             return
         display_tracks("Library View", library)
-        title = input("Song title to add: ").strip()
+        title = input("Song title to add: ")
 
-        found = None
-        for s in library:
-            if s.get("title", "").lower() == title.lower():
-                found = s
-                break
-
-        if not found:
+        index = get_index(library)
+        matches = index.by_title(title)
+        if not matches:
             print("❌ Song not found in library.\n")
             return
+        found = matches[0]
+        found_keys = index.keys[index.track_id(found)]
 
         for s in playlists[playlist]:
-            if (s.get("title", "").lower() == found.get("title", "").lower() and
-                s.get("artist", "").lower() == found.get("artist", "").lower()):
+            if (normalize(s.get("title", "")) == found_keys["title"] and
+                normalize(s.get("artist", "")) == found_keys["artist"]):
                 print(f"\n❌ Song '{found.get('title','')}' by '{found.get('artist','')}' is already in the playlist!\n")
                 return
 
         playlists[playlist].append(found.copy())
         print(f"\n🎵 Added: {found.get('title','')} → {playlist}\n")
 
+    def generate_playlist(library, playlists):
+        print_boxed("Generate Playlist by Duration")
+        name = input("Playlist name: ").strip()
+
+        if not name:
+            print("❌ Playlist name cannot be empty.")
+            return
+        if name in playlists:
+            print("❌ Playlist already exists.\n")
+            return
+
+        shortest = input("Shortest song (MM:SS): ").strip()
+        longest = input("Longest song (MM:SS): ").strip()
+        if ":" not in shortest or ":" not in longest:
+            print("❌ Durations must look like 02:30.\n")
+            return
+
+        lo, hi = sorted((duration_to_seconds(shortest), duration_to_seconds(longest)))
+        songs = tracks_in_duration(library, lo, hi)
+        if not songs:
+            print("❌ No songs in that duration range.\n")
+            return
+
+        playlists[name] = [s.copy() for s in songs]
+        print(f"✅ Playlist '{name}' created with {len(songs)} songs!\n")
+
     def show_playlists_only(pl):
         keys = list(pl.keys())
         if not keys:
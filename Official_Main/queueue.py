@@ -1,14 +1,16 @@
 from ui import print_boxed, display_tracks, print_menu, prompt_choice, show_help
 from sorting import sort_tracks
+from search_index import get_index
 import random
 
 def queue_add(queue, library):
-    title = input("Song title to queue: ").strip().lower()
-    for s in library:
-        if s.get("title","").lower() == title:
-            queue.append(s)
-            print(f"🎵 '{s.get('title','')}' added to queue!\n")
-            return
+    title = input("Song title to queue: ")
+    matches = get_index(library).by_title(title)
+    if matches:
+        s = matches[0]
+        queue.append(s)
+        print(f"🎵 '{s.get('title','')}' added to queue!\n")
+        return
     print("❌ Song not found.\n")
 
 def play_queue(queue):
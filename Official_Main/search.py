@@ -0,0 +1,302 @@
+import heapq
+import re
+from collections import OrderedDict
+from normalize import normalize
+from search_index import FIELDS, get_index, tokenize
+from parallel_scan import scanner
+from pattern_search import is_pattern_query, pattern_matches
+from sorting import duration_to_seconds
+
+DURATION_RANGE_RE = re.compile(r"^(\d+:\d{1,2})\s*-\s*(\d+:\d{1,2})$")
+
+
+class RankedResults:
+    # Heap-backed result list over (score, tiebreak, item) entries: only the
+    # rows that are actually read get popped into order, so the first page
+    # costs O(n + k log n).
+    def __init__(self, entries):
+        self._heap = [(-score, tie, item) for score, tie, item in entries]
+        heapq.heapify(self._heap)
+        self._ranked = []
+
+    def __len__(self):
+        return len(self._ranked) + len(self._heap)
+
+    def _fill(self, n):
+        while len(self._ranked) < n and self._heap:
+            self._ranked.append(heapq.heappop(self._heap)[2])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            stop = key.stop
+            if stop is None or stop < 0 or (key.start or 0) < 0:
+                stop = len(self)
+            self._fill(stop)
+        else:
+            self._fill(len(self) if key < 0 else key + 1)
+        return self._ranked[key]
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self[i]
+            i += 1
+
+
+class ResultCursor:
+    # Lazy, resumable view over a row iterator. Slicing pulls only the rows
+    # it needs; count_hint() is exact once the iterator is drained, or from
+    # the start when the caller knows the total, and an upper-bound
+    # estimate otherwise.
+    def __init__(self, rows, estimate=0, total=None):
+        self._rows = iter(rows)
+        self._buffer = []
+        self._estimate = estimate if total is None else total
+        self._total = total
+        self.done = False
+
+    def _fill(self, n=None):
+        while not self.done and (n is None or len(self._buffer) < n):
+            try:
+                self._buffer.append(next(self._rows))
+            except StopIteration:
+                self.done = True
+
+    def count_hint(self):
+        if self.done:
+            return len(self._buffer), True
+        if self._total is not None:
+            return self._total, True
+        return max(len(self._buffer), self._estimate), False
+
+    def __len__(self):
+        self._fill()
+        return len(self._buffer)
+
+    def __bool__(self):
+        self._fill(1)
+        return bool(self._buffer)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            stop = key.stop
+            self._fill(None if stop is None or stop < 0 or (key.start or 0) < 0 else stop)
+        else:
+            self._fill(None if key < 0 else key + 1)
+        return self._buffer[key]
+
+    def __iter__(self):
+        i = 0
+        while True:
+            self._fill(i + 1)
+            if i >= len(self._buffer):
+                return
+            yield self._buffer[i]
+            i += 1
+
+
+class QueryCache:
+    # LRU of normalized query -> [(track id, score)], or a ResultCursor over
+    # them that is still being filled, tagged with the index version it was
+    # computed against; any add/delete makes the entry stale.
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, query, version):
+        entry = self._entries.get(query)
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                del self._entries[query]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(query)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, query, version, ids):
+        self._entries[query] = (version, ids)
+        self._entries.move_to_end(query)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._entries), "maxsize": self.maxsize}
+
+
+query_cache = QueryCache()
+
+def normalize_query(keyword):
+    return normalize(keyword)
+
+# predicates receive a track's precomputed keys (LibraryIndex.keys), not the song
+def matches_keyword(keys, keyword):
+    return any(keyword in keys[f] for f in FIELDS)
+
+class KeywordPredicate:
+    def __init__(self, keyword):
+        self.keyword = keyword
+
+    def __call__(self, keys):
+        return matches_keyword(keys, self.keyword)
+
+
+class FieldFilter:
+    # exact normalized match on key fields, e.g. genre="alt rock"
+    def __init__(self, **fields):
+        self.fields = {f: normalize(v) for f, v in fields.items()}
+
+    def __call__(self, keys):
+        return all(keys.get(f) == v for f, v in self.fields.items())
+
+
+def filter_tracks(library, predicate):
+    index = get_index(library)
+    return [index.tracks[tid] for tid in scanner.scan(index, predicate)]
+
+def find_matches(index, keyword, candidates=None):
+    # candidates must be track ids in insertion order; equal scores keep it
+    if candidates is None:
+        narrowed = index.substring_candidates(keyword)
+        if narrowed is None:
+            return scanner.scan(index, KeywordPredicate(keyword))
+        candidates = sorted(narrowed)
+    keys = index.keys
+    return [tid for tid in candidates if matches_keyword(keys[tid], keyword)]
+
+def score_matches(index, keyword, ids):
+    scores = index.bm25(tokenize(keyword))
+    return [(tid, scores.get(tid, 0.0)) for tid in ids]
+
+def cached_matches(index, keyword):
+    scored = query_cache.get(keyword, index.version)
+    if isinstance(scored, ResultCursor):
+        scored = scored[:]
+    if scored is None:
+        scored = score_matches(index, keyword, find_matches(index, keyword))
+        query_cache.put(keyword, index.version, scored)
+    return scored
+
+def ranked(index, scored):
+    return RankedResults([(score, tid, index.tracks[tid]) for tid, score in scored])
+
+def stream_matches(index, keyword):
+    # BM25 hits come off a heap first, then zero-score substring matches are
+    # checked lazily in track order, so the first page of a broad query does
+    # not wait for the whole scan. The (track id, score) stream is cached as
+    # soon as it starts: a repeated search replays the rows already produced
+    # and resumes the same scan where the last reader stopped.
+    keys = index.keys
+    scores = index.bm25(tokenize(keyword))
+    hits = RankedResults((score, tid, tid) for tid, score in scores.items()
+                         if matches_keyword(keys[tid], keyword))
+    narrowed = index.substring_candidates(keyword)
+
+    def scored():
+        for tid in hits:
+            yield tid, scores[tid]
+
+        if narrowed is not None:
+            rest = sorted(narrowed)
+        elif scanner.enabled_for(index):
+            rest = scanner.scan(index, KeywordPredicate(keyword))
+        else:
+            rest = keys
+        for tid in rest:
+            if tid not in scores and matches_keyword(keys[tid], keyword):
+                yield tid, 0.0
+
+    estimate = len(index) if narrowed is None else len(narrowed)
+    matches = ResultCursor(scored(), estimate)
+    query_cache.put(keyword, index.version, matches)
+    return track_rows(index, keyword, matches)
+
+def track_rows(index, keyword, matches):
+    # songs for a (track id, score) cursor, falling back to tracks that
+    # sound like the keyword when nothing contains it
+    def rows():
+        found = False
+        for tid, _ in matches:
+            found = True
+            yield index.tracks[tid]
+        if not found:
+            for tid, _ in sound_alike(index, keyword):
+                yield index.tracks[tid]
+
+    count, exact = matches.count_hint()
+    return ResultCursor(rows(), count, total=count if exact and count else None)
+
+def tracks_in_duration(library, lo, hi):
+    # lo/hi in seconds, inclusive; shortest first
+    index = get_index(library)
+    return [index.tracks[tid] for tid in index.durations.range(lo, hi)]
+
+def nearest_duration(library, seconds, k=1):
+    index = get_index(library)
+    return [index.tracks[tid] for tid in index.durations.nearest(seconds, k)]
+
+def sound_alike(index, keyword):
+    return [(tid, 0.0) for tid in index.phonetic.lookup(tokenize(keyword))]
+
+def search_tracks(library, keyword):
+    index = get_index(library)
+    if is_pattern_query(keyword):
+        try:
+            return [index.tracks[tid] for tid in pattern_matches(index, keyword)]
+        except re.error:
+            return []
+    keyword = normalize_query(keyword)
+
+    m = DURATION_RANGE_RE.match(keyword)
+    if m:
+        lo, hi = sorted(map(duration_to_seconds, m.groups()))
+        return tracks_in_duration(library, lo, hi)
+
+    scored = query_cache.get(keyword, index.version)
+    if scored is None:
+        return stream_matches(index, keyword)
+    if isinstance(scored, ResultCursor):
+        return track_rows(index, keyword, scored)
+    if not scored:
+        scored = sound_alike(index, keyword)
+    return ranked(index, scored)
+
+
+class SearchSession:
+    # Search-as-you-type: when the new query still contains the previous one,
+    # every match must be among the previous matches, so only those are
+    # re-checked. Anything else goes back through the trigram index.
+    def __init__(self, library):
+        self.library = library
+        self.query = None
+        self.ids = None
+        self.scored = None
+        self.version = None
+
+    def update(self, keyword):
+        keyword = normalize_query(keyword)
+        index = get_index(self.library)
+
+        if self.ids is not None and self.version == index.version and self.query in keyword:
+            if keyword == self.query:
+                scored = self.scored
+            else:
+                scored = score_matches(index, keyword, find_matches(index, keyword, self.ids))
+        else:
+            scored = cached_matches(index, keyword)
+
+        self.query = keyword
+        self.scored = scored
+        self.ids = [tid for tid, _ in scored]
+        self.version = index.version
+        return ranked(index, scored)
+
+    def reset(self):
+        self.query = self.ids = self.scored = self.version = None
@@ -0,0 +1,207 @@
+import itertools
+import math
+import re
+from normalize import normalize
+from phonetic import PhoneticIndex
+from duration_index import DurationIndex
+from facets import FacetCounts
+from sorted_views import SortedView
+from sorting import duration_to_seconds, sort_keys
+
+FIELDS = ("title", "artist", "album")
+FIELD_BOOSTS = {"title": 3.0, "artist": 2.0, "album": 1.0}
+KEY_FIELDS = FIELDS + ("genre",)
+PHONETIC_FIELDS = ("title", "artist")
+
+# BM25 tuning constants
+K1 = 1.2
+B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# shared across rebuilt indexes so a version number is never reused
+_versions = itertools.count(1)
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def title_artist_key(title, artist):
+    return normalize(title) + "\x1f" + normalize(artist)
+
+def song_keys(song):
+    keys = {f: normalize(song.get(f, "")) for f in KEY_FIELDS}
+    keys["seconds"] = duration_to_seconds(song.get("duration", ""))
+    return keys
+
+
+class LibraryIndex:
+    def __init__(self, library):
+        self.library = library
+        self.tracks = {}          # track id -> song
+        self._ids = {}            # id(song) -> track id
+        self.keys = {}            # track id -> normalized field values
+        self.postings = {}        # token -> {track id: {field: term frequency}}
+        self.field_lengths = {f: {} for f in FIELDS}
+        self.total_lengths = dict.fromkeys(FIELDS, 0)
+        self.grams = {}           # trigram -> {track ids}
+        self._by_title = {}       # title key -> [track ids]
+        self._by_title_artist = {}  # (title key, artist key) -> [track ids]
+        self.phonetic = PhoneticIndex()
+        self.durations = DurationIndex()
+        self.facets = FacetCounts()
+        self.views = {}           # sort mode -> SortedView, built on first use
+        self.version = next(_versions)
+        self._next_id = 0
+
+        for song in library:
+            self.add(song)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def track_id(self, song):
+        return self._ids.get(id(song))
+
+    def view(self, mode):
+        # the library ordered by title/artist/album/duration; kept up to
+        # date by add and remove once it exists
+        view = self.views.get(mode)
+        if view is None:
+            view = self.views[mode] = SortedView(mode, self.tracks)
+        return view
+
+    def by_title(self, title):
+        return [self.tracks[tid] for tid in self.title_ids(normalize(title))]
+
+    def by_title_artist(self, title, artist):
+        ids = self.title_artist_ids(normalize(title), normalize(artist))
+        return self.tracks[ids[0]] if ids else None
+
+    # same lookups for callers that already hold normalized keys
+    def title_ids(self, title_key):
+        return self._by_title.get(title_key, ())
+
+    def title_artist_ids(self, title_key, artist_key):
+        return self._by_title_artist.get((title_key, artist_key), ())
+
+    def add(self, song):
+        tid = self._next_id
+        self._next_id += 1
+        self.tracks[tid] = song
+        self._ids[id(song)] = tid
+        keys = self.keys[tid] = song_keys(song)
+        self._by_title.setdefault(keys["title"], []).append(tid)
+        self._by_title_artist.setdefault((keys["title"], keys["artist"]), []).append(tid)
+        self.durations.add(tid, keys["seconds"])
+        self.facets.add(tid, keys, song)
+        for view in self.views.values():
+            view.add(tid, song)
+
+        for field in FIELDS:
+            tokens = tokenize(keys[field])
+            self.field_lengths[field][tid] = len(tokens)
+            self.total_lengths[field] += len(tokens)
+            for token in tokens:
+                freqs = self.postings.setdefault(token, {}).setdefault(tid, {})
+                freqs[field] = freqs.get(field, 0) + 1
+            for gram in trigrams(keys[field]):
+                self.grams.setdefault(gram, set()).add(tid)
+            if field in PHONETIC_FIELDS:
+                self.phonetic.add(tid, tokens)
+
+        self.version = next(_versions)
+        return tid
+
+    def remove(self, song):
+        tid = self._ids.pop(id(song), None)
+        if tid is None:
+            return None
+        del self.tracks[tid]
+        keys = self.keys.pop(tid)
+        _discard(self._by_title, keys["title"], tid)
+        _discard(self._by_title_artist, (keys["title"], keys["artist"]), tid)
+        self.durations.remove(tid, keys["seconds"])
+        self.facets.remove(tid, keys)
+        sort_keys.invalidate(song)
+        for view in self.views.values():
+            view.remove(tid)
+
+        tokens = set()
+        grams = set()
+        for field in FIELDS:
+            self.total_lengths[field] -= self.field_lengths[field].pop(tid)
+            tokens.update(tokenize(keys[field]))
+            grams.update(trigrams(keys[field]))
+            if field in PHONETIC_FIELDS:
+                self.phonetic.remove(tid, tokenize(keys[field]))
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(tid, None)
+            if not docs:
+                del self.postings[token]
+        for gram in grams:
+            ids = self.grams.get(gram)
+            if ids is None:
+                continue
+            ids.discard(tid)
+            if not ids:
+                del self.grams[gram]
+
+        self.version = next(_versions)
+        return tid
+
+    def substring_candidates(self, keyword):
+        # superset of the tracks containing keyword, or None when the
+        # keyword is too short to narrow anything down
+        grams = trigrams(keyword)
+        if not grams:
+            return None
+        sets = sorted((self.grams.get(g, set()) for g in grams), key=len)
+        return set.intersection(*sets)
+
+    def idf(self, token):
+        n = len(self.tracks)
+        df = len(self.postings.get(token, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def bm25(self, tokens):
+        # per-field BM25 summed with FIELD_BOOSTS weights
+        scores = {}
+        n = len(self.tracks) or 1
+        avg = {f: (self.total_lengths[f] / n) or 1 for f in FIELDS}
+
+        for token in set(tokens):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = self.idf(token)
+            for tid, freqs in docs.items():
+                total = 0.0
+                for field, tf in freqs.items():
+                    norm = 1 - B + B * self.field_lengths[field][tid] / avg[field]
+                    total += FIELD_BOOSTS[field] * tf * (K1 + 1) / (tf + K1 * norm)
+                scores[tid] = scores.get(tid, 0.0) + idf * total
+        return scores
+
+
+def _discard(table, key, tid):
+    ids = table.get(key)
+    if ids is None:
+        return
+    ids.remove(tid)
+    if not ids:
+        del table[key]
+
+
+_index = None
+
+def get_index(library):
+    global _index
+    if _index is None or _index.library is not library or len(_index) != len(library):
+        _index = LibraryIndex(library)
+    return _index
@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from sorting import sort_keys
+
+# Library orderings kept sorted as tracks come and go. Entries are
+# (sort key, track id) pairs split into chunks of at most 2 * LOAD, with the
+# last entry of each chunk kept in `maxes`: an insert or delete is two
+# bisects plus a shift inside one chunk, instead of moving half the library.
+# Track ids follow insertion order, so equal keys keep library order just
+# like the stable sort in sort_tracks. A view reads as a sequence of songs,
+# so display_tracks can page through it directly.
+
+VIEW_MODES = ("title", "artist", "album", "duration")
+LOAD = 512
+
+
+class SortedView:
+    def __init__(self, mode, tracks):
+        self.mode = mode
+        self.tracks = tracks          # track id -> song, shared with the index
+        self._filed = {}              # track id -> key it is filed under
+        self._chunks = []
+        self._maxes = []
+        self._starts = None           # position of each chunk, rebuilt on demand
+
+        key = sort_keys.key
+        entries = sorted((key(song, mode), tid) for tid, song in tracks.items())
+        for k, tid in entries:
+            self._filed[tid] = k
+        self._chunks = [entries[i:i + LOAD] for i in range(0, len(entries), LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+
+    def __len__(self):
+        return len(self._filed)
+
+    def add(self, tid, song):
+        entry = (sort_keys.key(song, self.mode), tid)
+        self._filed[tid] = entry[0]
+        self._starts = None
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            return
+
+        c = min(bisect_left(self._maxes, entry), len(self._chunks) - 1)
+        chunk = self._chunks[c]
+        insort(chunk, entry)
+        self._maxes[c] = chunk[-1]
+        if len(chunk) > 2 * LOAD:
+            self._chunks[c + 1:c + 1] = [chunk[LOAD:]]
+            del chunk[LOAD:]
+            self._maxes[c:c + 1] = [chunk[-1], self._chunks[c + 1][-1]]
+
+    def remove(self, tid):
+        k = self._filed.pop(tid, None)
+        if k is None:
+            return
+        entry = (k, tid)
+        c = bisect_left(self._maxes, entry)
+        chunk = self._chunks[c]
+        del chunk[bisect_left(chunk, entry)]
+        self._starts = None
+        if chunk:
+            self._maxes[c] = chunk[-1]
+        else:
+            del self._chunks[c]
+            del self._maxes[c]
+
+    def _locate(self, pos):
+        # -> (chunk number, offset inside it) for a position in the view
+        if self._starts is None:
+            self._starts = [0, *accumulate(len(chunk) for chunk in self._chunks)][:-1]
+        c = bisect_right(self._starts, pos) - 1
+        return c, pos - self._starts[c]
+
+    def ids(self, start=0, stop=None):
+        # track ids in view order, from position start up to stop
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        c, i = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            rows = self._chunks[c][i:i + remaining]
+            for _, tid in rows:
+                yield tid
+            remaining -= len(rows)
+            c, i = c + 1, 0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [self.tracks[tid] for tid in self.ids(start, stop)]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("view index out of range")
+        c, i = self._locate(key)
+        return self.tracks[self._chunks[c][i][1]]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            for _, tid in chunk:
+                yield self.tracks[tid]
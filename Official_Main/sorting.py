@@ -1,3 +1,10 @@
+from bisect import bisect_left, bisect_right
+from heapq import heapify, heappop
+from itertools import chain
+from parallel_sort import sorter
+
+RADIX_BITS = 11     # 2048 buckets per pass: one pass covers durations up to 34:07
+
 def duration_to_seconds(dur):
     try:
         mm, ss = dur.split(":")
@@ -11,6 +18,9 @@ def sort_tracks(songs, mode):
 
 class TimSort:
     minRUN = 16
+    MIN_GALLOP = 7
+    minGallop = MIN_GALLOP
+    merged = 0      # elements passed through merges by the last timsort call
     
     @staticmethod
     def calcMinRun(n):
@@ -21,37 +31,182 @@ class TimSort:
         return n + r
 
     @staticmethod
-    def insertionSort(arr, left, right):
-        for i in range(left + 1, right + 1):
+    def insertionSort(arr, left, right, start=None):
+        # binary insertion; arr[left:start] is already sorted (the natural
+        # run being extended), bisect_right keeps equal keys stable
+        if start is None or start <= left:
+            start = left + 1
+        for i in range(start, right + 1):
             key = arr[i]
-            j = i - 1
-            while j >= left and arr[j] > key:
-                arr[j + 1] = arr[j]
-                j -= 1
-            arr[j + 1] = key
+            pos = bisect_right(arr, key, left, i)
+            if pos != i:
+                arr[pos + 1:i + 1] = arr[pos:i]
+                arr[pos] = key
+
+    # first index in a[lo:hi] whose element is >= key, probing 1, 2, 4, ...
+    # positions from one end before bisecting
+    @staticmethod
+    def gallopLeft(key, a, lo, hi, fromRight=False):
+        if fromRight:
+            ofs = 1
+            while ofs <= hi - lo and a[hi - ofs] >= key:
+                ofs <<= 1
+            return bisect_left(a, key, max(lo, hi - ofs), hi - (ofs >> 1))
+        ofs = 0
+        last = lo
+        while lo + ofs < hi and a[lo + ofs] < key:
+            last = lo + ofs + 1
+            ofs = (ofs << 1) + 1
+        return bisect_left(a, key, last, min(hi, lo + ofs))
+
+    # first index in a[lo:hi] whose element is > key
+    @staticmethod
+    def gallopRight(key, a, lo, hi, fromRight=False):
+        if fromRight:
+            ofs = 1
+            while ofs <= hi - lo and a[hi - ofs] > key:
+                ofs <<= 1
+            return bisect_right(a, key, max(lo, hi - ofs), hi - (ofs >> 1))
+        ofs = 0
+        last = lo
+        while lo + ofs < hi and a[lo + ofs] <= key:
+            last = lo + ofs + 1
+            ofs = (ofs << 1) + 1
+        return bisect_right(a, key, last, min(hi, lo + ofs))
 
     @staticmethod
     def merge(arr, l, m, r):
-        left = arr[l:m+1]
-        right = arr[m+1:r+1]
-        i = j = 0
-        k = l
-        while i < len(left) and j < len(right):
-            if left[i] <= right[j]:
-                arr[k] = left[i]
-                i += 1
-            else:
-                arr[k] = right[j]
+        # merges arr[l:m+1] and arr[m+1:r+1]; the ends that are already in
+        # place are skipped and only the smaller remaining run is buffered
+        start = TimSort.gallopRight(arr[m + 1], arr, l, m + 1)
+        if start > m:
+            return
+        end = TimSort.gallopLeft(arr[m], arr, m + 1, r + 1, fromRight=True)
+        na = m + 1 - start
+        nb = end - (m + 1)
+        if na <= nb:
+            TimSort.mergeLo(arr, start, na, nb)
+        else:
+            TimSort.mergeHi(arr, start, na, nb)
+
+    @staticmethod
+    def mergeLo(arr, lo, na, nb):
+        a = arr[lo:lo + na]
+        i = 0
+        j = lo + na
+        k = lo
+        endB = lo + na + nb
+        minGallop = TimSort.minGallop
+
+        while i < na and j < endB:
+            # one element at a time until one run keeps winning
+            countA = countB = 0
+            while i < na and j < endB:
+                if arr[j] < a[i]:
+                    arr[k] = arr[j]
+                    j += 1
+                    countB += 1
+                    countA = 0
+                else:
+                    arr[k] = a[i]
+                    i += 1
+                    countA += 1
+                    countB = 0
+                k += 1
+                if countA >= minGallop or countB >= minGallop:
+                    break
+
+            # galloping: copy whole stretches found by exponential search
+            minGallop += 1
+            while i < na and j < endB:
+                minGallop -= minGallop > 1
+                countA = TimSort.gallopRight(arr[j], a, i, na) - i
+                arr[k:k + countA] = a[i:i + countA]
+                k += countA
+                i += countA
+                if i >= na:
+                    break
+                arr[k] = arr[j]
+                k += 1
                 j += 1
-            k += 1
-        while i < len(left):
-            arr[k] = left[i]
-            i += 1
-            k += 1
-        while j < len(right):
-            arr[k] = right[j]
-            j += 1
-            k += 1
+                if j >= endB:
+                    break
+
+                countB = TimSort.gallopLeft(a[i], arr, j, endB) - j
+                arr[k:k + countB] = arr[j:j + countB]
+                k += countB
+                j += countB
+                if j >= endB:
+                    break
+                arr[k] = a[i]
+                k += 1
+                i += 1
+                if countA < TimSort.MIN_GALLOP and countB < TimSort.MIN_GALLOP:
+                    break
+            minGallop += 1
+
+        # whatever is left of B is already in place
+        arr[k:k + na - i] = a[i:]
+        TimSort.minGallop = max(1, minGallop)
+
+    @staticmethod
+    def mergeHi(arr, lo, na, nb):
+        b = arr[lo + na:lo + na + nb]
+        i = lo + na - 1
+        j = nb - 1
+        k = lo + na + nb - 1
+        minGallop = TimSort.minGallop
+
+        while i >= lo and j >= 0:
+            countA = countB = 0
+            while i >= lo and j >= 0:
+                if b[j] < arr[i]:
+                    arr[k] = arr[i]
+                    i -= 1
+                    countA += 1
+                    countB = 0
+                else:
+                    arr[k] = b[j]
+                    j -= 1
+                    countB += 1
+                    countA = 0
+                k -= 1
+                if countA >= minGallop or countB >= minGallop:
+                    break
+
+            minGallop += 1
+            while i >= lo and j >= 0:
+                minGallop -= minGallop > 1
+                p = TimSort.gallopRight(b[j], arr, lo, i + 1, fromRight=True)
+                countA = i + 1 - p
+                arr[k - countA + 1:k + 1] = arr[p:i + 1]
+                k -= countA
+                i = p - 1
+                if i < lo:
+                    break
+                arr[k] = b[j]
+                k -= 1
+                j -= 1
+                if j < 0:
+                    break
+
+                p = TimSort.gallopLeft(arr[i], b, 0, j + 1, fromRight=True)
+                countB = j + 1 - p
+                arr[k - countB + 1:k + 1] = b[p:j + 1]
+                k -= countB
+                j = p - 1
+                if j < 0:
+                    break
+                arr[k] = arr[i]
+                k -= 1
+                i -= 1
+                if countA < TimSort.MIN_GALLOP and countB < TimSort.MIN_GALLOP:
+                    break
+            minGallop += 1
+
+        # whatever is left of A is already in place
+        arr[lo:lo + j + 1] = b[:j + 1]
+        TimSort.minGallop = max(1, minGallop)
 
     @staticmethod
     def findRun(arr, start, n):
@@ -72,6 +227,8 @@ class TimSort:
     def timsort(arr):
         n = len(arr)
         minRun = TimSort.calcMinRun(n)
+        TimSort.minGallop = TimSort.MIN_GALLOP
+        TimSort.merged = 0
         runs = []
 
         i = 0
@@ -81,47 +238,263 @@ class TimSort:
 
             if runLen < minRun:
                 end = min(i + minRun, n)
-                TimSort.insertionSort(arr, i, end - 1)
+                TimSort.insertionSort(arr, i, end - 1, runEnd)
                 runEnd = end
 
             runs.append((i, runEnd))
             i = runEnd
+            TimSort.mergeCollapse(arr, runs)
 
-            while len(runs) > 1:
-                l1, r1 = runs[-2]
-                l2, r2 = runs[-1]
-                len1, len2 = r1 - l1, r2 - l2
-                if len1 <= len2:
-                    TimSort.merge(arr, l1, r1 - 1, r2 - 1)
-                    runs.pop()
-                    runs[-1] = (l1, r2)
-                else:
-                    break
+        TimSort.mergeForceCollapse(arr, runs)
 
+    @staticmethod
+    def mergeAt(arr, runs, i):
+        l1, r1 = runs[i]
+        l2, r2 = runs[i + 1]
+        TimSort.merge(arr, l1, r1 - 1, r2 - 1)
+        TimSort.merged += r2 - l1
+        runs[i] = (l1, r2)
+        del runs[i + 1]
+
+    @staticmethod
+    def mergeCollapse(arr, runs):
+        # Keeps CPython listsort's invariants on the run stack, checked on the
+        # top four runs (A, B, C, D from the bottom):
+        #   len(B) > len(C) + len(D),  len(A) > len(B) + len(C),  len(C) > len(D)
+        # so run lengths grow at least like Fibonacci numbers going down the
+        # stack, the stack stays O(log n) deep and merges stay balanced.
+        size = lambda k: runs[k][1] - runs[k][0]
         while len(runs) > 1:
-            l1, r1 = runs[-2]
-            l2, r2 = runs[-1]
-            TimSort.merge(arr, l1, r1 - 1, r2 - 1)
-            runs.pop()
-            runs[-1] = (l1, r2)
+            n = len(runs) - 2
+            if (n > 0 and size(n - 1) <= size(n) + size(n + 1)) or \
+                    (n > 1 and size(n - 2) <= size(n - 1) + size(n)):
+                if size(n - 1) < size(n + 1):
+                    n -= 1
+            elif size(n) > size(n + 1):
+                break
+            TimSort.mergeAt(arr, runs, n)
 
-def sort_tracks(songs, mode="title"):
-    if not songs:
-        print("❌ Nothing to sort.\n")
-        return
+    @staticmethod
+    def mergeForceCollapse(arr, runs):
+        size = lambda k: runs[k][1] - runs[k][0]
+        while len(runs) > 1:
+            n = len(runs) - 2
+            if n > 0 and size(n - 1) < size(n + 1):
+                n -= 1
+            TimSort.mergeAt(arr, runs, n)
 
-    mode = mode.lower()
+class RankTable:
+    # Dense integer ranks for one text column. `texts` holds the distinct
+    # lowercased values in order; values new to the table are merged in and
+    # values no track uses any more are taken out, and only ranks from the
+    # first changed position onward are renumbered, so the table is never
+    # re-sorted as a whole. Ranks are looked up by raw field value, and each
+    # track is counted under the value it had when last ranked, so edits and
+    # forget() release values nobody uses.
+    def __init__(self, mode):
+        self.mode = mode
+        self.texts = []
+        self.ranks = {}         # raw value -> rank
+        self._raws = {}         # lowercased text -> {raw values}
+        self._counts = {}       # raw value -> tracks counted under it
+        self._owners = {}       # id(song) -> raw value it is counted under
+        self._dirty = None      # first position whose ranks are out of date
+
+    def __len__(self):
+        return len(self.texts)
+
+    def encode(self, songs):
+        mode = self.mode
+        owners = self._owners
+        added = set()
+        for s in songs:
+            raw = s.get(mode, "")
+            old = owners.get(id(s), owners)
+            if old is raw or old == raw:
+                continue
+            if old is not owners:
+                self._release(old)
+            owners[id(s)] = raw
+            self._acquire(raw, added)
+
+        if added:
+            fresh = sorted(added)
+            # two sorted runs: list.sort just merges them
+            self.texts += fresh
+            self.texts.sort()
+            self._mark(bisect_left(self.texts, fresh[0]))
+        self._renumber()
+        ranks = self.ranks
+        return [ranks[s.get(mode, "")] for s in songs]
+
+    def forget(self, song):
+        raw = self._owners.pop(id(song), self._owners)
+        if raw is not self._owners:
+            self._release(raw)
+
+    def _acquire(self, raw, added):
+        count = self._counts.get(raw, 0)
+        self._counts[raw] = count + 1
+        if count:
+            return
+        text = (raw or "").lower()
+        siblings = self._raws.setdefault(text, set())
+        if not siblings:
+            added.add(text)
+        elif text not in added:
+            # same text under another spelling: same rank (spellings first
+            # seen in this batch are ranked together by _renumber)
+            self.ranks[raw] = self.ranks[next(iter(siblings))]
+        siblings.add(raw)
+
+    def _release(self, raw):
+        count = self._counts.pop(raw) - 1
+        if count:
+            self._counts[raw] = count
+            return
+        del self.ranks[raw]
+        text = (raw or "").lower()
+        siblings = self._raws[text]
+        siblings.discard(raw)
+        if not siblings:
+            del self._raws[text]
+            i = bisect_left(self.texts, text)
+            del self.texts[i]
+            self._mark(i)
+
+    def _mark(self, i):
+        if self._dirty is None or i < self._dirty:
+            self._dirty = i
+
+    def _renumber(self):
+        if self._dirty is None:
+            return
+        ranks = self.ranks
+        raws = self._raws
+        for rank in range(self._dirty, len(self.texts)):
+            for raw in raws[self.texts[rank]]:
+                ranks[raw] = rank
+        self._dirty = None
+
+
+class SortKeyCache:
+    # Sort keys memoized per track (by object identity) and mode. Each entry
+    # keeps the raw value it was built from and is rebuilt when that differs,
+    # so a track edited in place never sorts under a stale key and a reused
+    # id() can only ever hit an entry that is still correct.
+    def __init__(self):
+        self._modes = {}        # mode -> {id(song): (raw, key)}
+        self._ranks = {}        # mode -> RankTable
 
+    def __len__(self):
+        return sum(len(entries) for entries in self._modes.values())
+
+    def key(self, song, mode):
+        # "duration" -> seconds, any other field -> lowercased text
+        entries = self._modes.get(mode)
+        if entries is None:
+            entries = self._modes[mode] = {}
+        raw = song.get(mode, "")
+        hit = entries.get(id(song))
+        if hit is not None and (hit[0] is raw or hit[0] == raw):
+            return hit[1]
+        value = duration_to_seconds(raw) if mode == "duration" else (raw or "").lower()
+        entries[id(song)] = (raw, value)
+        return value
+
+    def ranks(self, songs, mode):
+        # Keys as small ints that order the same way: seconds for "duration",
+        # otherwise the text's dense rank in the column's RankTable
+        if mode == "duration":
+            key = self.key
+            return [key(s, mode) for s in songs]
+        table = self._ranks.get(mode)
+        if table is None:
+            table = self._ranks[mode] = RankTable(mode)
+        return table.encode(songs)
+
+    def invalidate(self, song):
+        # called when a track leaves the library
+        for entries in self._modes.values():
+            entries.pop(id(song), None)
+        for table in self._ranks.values():
+            table.forget(song)
+
+    def clear(self):
+        self._modes.clear()
+        self._ranks.clear()
+
+sort_keys = SortKeyCache()
+
+
+def radix_sort(items, keys):
+    # Stable LSD radix sort of items by integer keys, RADIX_BITS per pass.
+    # Keys are shifted to start at 0; when they span no more than
+    # max(2 ** RADIX_BITS, n) values (durations, dense ranks) a single
+    # counting pass does it: O(n) with no comparisons.
+    if not items:
+        return []
+    lo = min(keys)
+    span = max(keys) - lo
+    mask = (1 << RADIX_BITS) - 1
+    if span <= max(mask, len(items)):
+        # one bucket per key value, items appended directly
+        buckets = [[] for _ in range(span + 1)]
+        appends = [b.append for b in buckets]
+        for k, item in zip(keys, items):
+            appends[k - lo](item)
+        return list(chain.from_iterable(buckets))
+
+    rows = [(k - lo, item) for k, item in zip(keys, items)]
+    shift = 0
+    while True:
+        buckets = [[] for _ in range(min(mask, span >> shift) + 1)]
+        for row in rows:
+            buckets[(row[0] >> shift) & mask].append(row)
+        rows = list(chain.from_iterable(buckets))
+        shift += RADIX_BITS
+        if span >> shift == 0:
+            break
+    return [item for _, item in rows]
+
+
+def sort_key(mode):
+    # the key sort_tracks orders by, computed directly for one-off passes
+    # that should not fill the shared cache
     if mode == "duration":
-        def key_func(s):
-            mm, ss = s.get("duration", "0:0").split(":")
-            return int(mm) * 60 + int(ss)
-    else:
-        key_func = lambda s: s.get(mode, "").lower()
+        return lambda s: duration_to_seconds(s.get("duration", ""))
+    return lambda s: (s.get(mode, "") or "").lower()
+
 
-    sortable = [(key_func(s), i, s) for i, s in enumerate(songs)]
+def lazy_sorted(songs, mode="title"):
+    # songs in sort_tracks order, produced on demand without touching the
+    # list: heapify is O(n) and each row after that is one O(log n) pop, so
+    # the first page of k rows costs O(n + k log n). Positions break ties,
+    # keeping equal keys in list order.
+    key = sort_key(mode.lower())
+    heap = [(key(s), i) for i, s in enumerate(songs)]
+    heapify(heap)
+    while heap:
+        yield songs[heappop(heap)[1]]
 
-    TimSort().timsort(sortable)
 
-    for i in range(len(songs)):
-        songs[i] = sortable[i][2]
+def sort_tracks(songs, mode="title", parallel_threshold=None):
+    if not songs:
+        print("❌ Nothing to sort.\n")
+        return
+
+    # Text columns are sorted by TimSort on (rank, position, song) tuples,
+    # so every comparison is between small ints; durations are small ints
+    # already and take the linear-time radix path. The multi-process sample
+    # sort only runs when a threshold has been set, here or through the
+    # environment (it is off by default).
+    mode = mode.lower()
+    keys = sort_keys.ranks(songs, mode)
+    if sorter.enabled_for(len(songs), parallel_threshold):
+        songs[:] = sorter.sort(songs, keys)
+    elif mode == "duration":
+        songs[:] = radix_sort(songs, keys)
+    else:
+        sortable = [(k, i, s) for i, (k, s) in enumerate(zip(keys, songs))]
+        TimSort.timsort(sortable)
+        songs[:] = [row[2] for row in sortable]
@@ -0,0 +1,144 @@
+import itertools
+import math
+import random
+import unittest
+from benchmark import generate_library
+from parallel_scan import serial_scan
+from pattern_search import compile_query, pattern_matches
+from search_index import LibraryIndex
+from sorting import RankTable, TimSort, sort_tracks
+from ui import sort_playlist
+
+# Run from Official_Main:  python -m unittest test_sorting
+
+N = 20000
+
+# quantifiers, groups and classes that must never make the literal
+# prefilter drop a track the regex matches
+CHECK_PATTERNS = ["/lo{1,3}ve/", "/lo{2,}ve/", "/lo{0,1}ve/", "/ni{1}ght{0,1} /", "/(lo){1,2}ve/",
+                  "/fi?re/", "/lo+ve/", "/lov*e/", "/[lr]ain/", "/lo.e/", "/^let d/", "/love|fire/",
+                  "/\\blove\\b/", "/dream{1,}/", "/a{10,}/", "artist:/ko{1,2}/", "title:Lo*ve*"]
+
+
+class Counted:
+    # sort key wrapper that counts comparisons; tag is never compared, so it
+    # shows whether equal keys kept their input order
+    count = 0
+    __slots__ = ("key", "tag")
+
+    def __init__(self, key, tag=0):
+        self.key = key
+        self.tag = tag
+
+    def __lt__(self, other):
+        Counted.count += 1
+        return self.key < other.key
+
+    def __le__(self, other):
+        Counted.count += 1
+        return self.key <= other.key
+
+    def __gt__(self, other):
+        Counted.count += 1
+        return self.key > other.key
+
+    def __ge__(self, other):
+        Counted.count += 1
+        return self.key >= other.key
+
+
+def sorted_runs(lengths, n, rng, values=None):
+    # ascending runs of the given lengths, cut off at n elements
+    values = values or rng.random
+    data = []
+    for length in lengths:
+        if len(data) >= n:
+            break
+        data += sorted(values() for _ in range(length))
+    return data[:n]
+
+def adversarial_inputs(n, seed=0, values=None):
+    # run-length patterns that unbalance merges when only the top two runs
+    # are compared (strictly shrinking runs never trigger a merge until the
+    # final collapse), plus random data as the reference point
+    rng = random.Random(seed)
+    values = values or rng.random
+    fib = [40, 64]
+    while sum(fib) < n:
+        fib.append(fib[-1] + fib[-2])
+    # lengths fall from ~n/100 towards the 32-element minimum run
+    longest = max(64, n // 100)
+    step = max(1, longest * longest // (2 * n))
+    yield "shrinking_runs", sorted_runs(itertools.chain(range(longest, 32, -step), itertools.repeat(32)), n, rng, values)
+    yield "fibonacci_runs", sorted_runs(reversed(fib), n, rng, values)
+    yield "long_short_runs", sorted_runs(itertools.cycle((2000, 40)), n, rng, values)
+    yield "growing_runs", sorted_runs(itertools.count(40, 16), n, rng, values)
+    yield "descending", sorted((values() for _ in range(n)), reverse=True)
+    yield "random", [values() for _ in range(n)]
+
+
+class TimSortWorstCaseTest(unittest.TestCase):
+    def test_adversarial_runs_stay_n_log_n(self):
+        # comparisons and elements merged must both stay under
+        # n * log2(n) + n (the extra n pays for finding the runs)
+        bound = N * math.log2(N) + N
+        for name, data in adversarial_inputs(N):
+            with self.subTest(pattern=name):
+                items = [Counted(x) for x in data]
+                Counted.count = 0
+                TimSort.timsort(items)
+                self.assertEqual([c.key for c in items], sorted(data))
+                self.assertLessEqual(Counted.count, bound)
+                self.assertLessEqual(TimSort.merged, bound)
+
+    def test_stable_on_duplicate_keys(self):
+        rng = random.Random(1)
+        for name, data in adversarial_inputs(N, seed=2, values=lambda: rng.randrange(50)):
+            with self.subTest(pattern=name):
+                items = [Counted(x, tag) for tag, x in enumerate(data)]
+                TimSort.timsort(items)
+                expected = sorted(range(len(data)), key=data.__getitem__)
+                self.assertEqual([c.tag for c in items], expected)
+
+    def test_small_and_edge_inputs(self):
+        for data in ([], [1], [2, 1], [1, 1, 1], list(range(100)), list(range(100, 0, -1))):
+            items = list(data)
+            TimSort.timsort(items)
+            self.assertEqual(items, sorted(data))
+
+
+class RankTableTest(unittest.TestCase):
+    def test_mixed_case_in_one_batch(self):
+        # spellings that only differ in case, all new in the same encode()
+        songs = [{"title": "Love"}, {"title": "love"}, {"title": "Adele"},
+                 {"title": "ADELE"}, {"title": "LOVE"}, {"title": "Zoo"}]
+        ranks = RankTable("title").encode(songs)
+        self.assertEqual(ranks, [1, 1, 0, 0, 1, 2])
+
+    def test_mixed_case_after_earlier_batch(self):
+        table = RankTable("artist")
+        table.encode([{"artist": "adele"}])
+        self.assertEqual(table.encode([{"artist": "Prince"}, {"artist": "PRINCE"}, {"artist": "ADELE"}]), [1, 1, 0])
+
+    def test_sort_tracks_and_playlist_with_mixed_case(self):
+        for sort in (sort_tracks, sort_playlist):
+            with self.subTest(sort=sort.__name__):
+                songs = [{"title": t, "artist": a, "album": "", "duration": "3:00"}
+                         for t, a in (("love", "Adele"), ("Zoo", "ADELE"), ("Love", "adele"), ("abc", "x"))]
+                sort(songs, "title")
+                self.assertEqual([s["title"] for s in songs], ["abc", "love", "Love", "Zoo"])
+
+
+class PatternPrefilterTest(unittest.TestCase):
+    def test_prefilter_matches_full_scan(self):
+        library = generate_library(N)
+        library.append(dict(library[0], title="Looove Song"))
+        index = LibraryIndex(library)
+        for query in CHECK_PATTERNS:
+            with self.subTest(query=query):
+                predicate, _ = compile_query(query)
+                self.assertEqual(pattern_matches(index, query), serial_scan(index, predicate))
+
+
+if __name__ == '__main__':
+    unittest.main()
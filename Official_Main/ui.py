@@ -1,4 +1,5 @@
 import shutil
+from sorting import sort_keys
 
 def terminal_width(default=80):
     try:
@@ -53,6 +54,13 @@ def show_help():
     print("- When adding songs, provide the requested fields; durations like '03:25' are recommended.")
     print()
 
+def count_rows(songs, upto):
+    # lazy result cursors only produce the first `upto` rows to answer
+    if hasattr(songs, "count_hint"):
+        songs[:upto]
+        return songs.count_hint()
+    return len(songs), True
+
 def display_tracks(name, songs):
     title_w = 30
     artist_w = 20
@@ -64,7 +72,7 @@ def display_tracks(name, songs):
         text = str(text)
         return text[:max_w-3] + "..." if len(text) > max_w else text
 
-    total = len(songs)
+    total, _ = count_rows(songs, 1)
     if total == 0:
         w = terminal_width()
         key_col = 6
@@ -91,12 +99,18 @@ def display_tracks(name, songs):
         return
 
     page_size = 10
-    total_pages = (total + page_size - 1) // page_size
     page = 1
 
+    def page_count(p):
+        # one row past page p tells a lazy cursor whether p + 1 exists
+        total, exact = count_rows(songs, p * page_size + 1)
+        total_pages = (total + page_size - 1) // page_size
+        return total_pages, (str(total_pages) if exact else f"~{total_pages}")
+
     def print_page(p):
         start = (p - 1) * page_size
-        end = min(start + page_size, total)
+        end = start + page_size
+        total_pages, label = page_count(p)
 
         w = terminal_width()
         key_col = 6
@@ -105,7 +119,7 @@ def display_tracks(name, songs):
         row = "+" + "-" * (key_col + 2) + "+" + "-" * (desc_col + 2) + "+"
 
         print(top)
-        header_title = f"Playlist: {name}  (Page {p}/{total_pages})"
+        header_title = f"Playlist: {name}  (Page {p}/{label})"
         print("|{:^{width}}|".format(header_title, width=total_w))
         print(row)
 
@@ -130,13 +144,14 @@ def display_tracks(name, songs):
             ))
 
         print(row)
+        return total_pages, label
 
     while True:
-        print_page(page)
+        total_pages, label = print_page(page)
         if total_pages <= 1:
             break
 
-        choice = input(f"Page {page}/{total_pages} - press 'n' for next page, 'p' for previous, or Enter to continue: ").strip().lower()
+        choice = input(f"Page {page}/{label} - press 'n' for next page, 'p' for previous, or Enter to continue: ").strip().lower()
         if choice == 'n' and page < total_pages:
             page += 1
             continue
@@ -250,29 +265,13 @@ def sort_playlist(songs, mode="title"):
         return
 
     mode = (mode or 'title').lower()
-
-    def duration_seconds(s):
-        mm_ss = s.get("duration", "0:0")
-        try:
-            mm, ss = mm_ss.split(":")
-            return int(mm) * 60 + int(ss)
-        except Exception:
-            return 0
-
-    def composite_key(s):
-        if mode == 'duration':
-            primary = duration_seconds(s)
-        else:
-            primary = (s.get(mode, '') or '').lower()
-
-        title = (s.get('title', '') or '').lower()
-        artist = (s.get('artist', '') or '').lower()
-        album = (s.get('album', '') or '').lower()
-        duration_val = duration_seconds(s)
-        date_val = s.get('date_added', '') or ''
-
-        return (primary, title, artist, album, duration_val, date_val)
-
-    songs.sort(key=composite_key)
+    # (primary, title, artist, album, seconds, date_added) with every text
+    # field swapped for its integer rank, so comparisons stay on ints
+    ranks = sort_keys.ranks
+    keys = list(zip(ranks(songs, mode), ranks(songs, 'title'), ranks(songs, 'artist'),
+                    ranks(songs, 'album'), ranks(songs, 'duration'),
+                    [s.get('date_added', '') or '' for s in songs]))
+    order = sorted(range(len(songs)), key=keys.__getitem__)
+    songs[:] = [songs[i] for i in order]
 
 